@@ -1,8 +1,18 @@
 import logging
 from homeassistant.const import Platform
+from homeassistant.core import callback
+from homeassistant.helpers import device_registry as dr
 from .api import ZinguoAPI
+from .config_flow import get_option
 from .coordinator import ZinguoCoordinator
-from .const import DOMAIN
+from .fleet import ZinguoFleet
+from .services import async_setup_services, async_unload_services
+from .storage import ZinguoStore
+from .const import (
+    DOMAIN, DATA_FLEET, CONF_POLLING_INTERVAL, CONF_STATE_MAX_AGE, CONF_LOCAL_HOSTS,
+    CONF_POLL_STRATEGY, POLL_STRATEGY_ADAPTIVE, CONF_REQUEST_TIMEOUT, CONF_LOCAL_TIMEOUT,
+    CONF_MAX_CONCURRENCY, CONF_REFRESH_DEBOUNCE,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,24 +27,65 @@ PLATFORMS = [
 
 async def async_setup_entry(hass, entry):
     """设置集成条目"""
-    # 初始化 API
-    api = ZinguoAPI(entry.data["account"], entry.data["password"])
+    # 恢复上次保存的令牌，启动时无需再登录
+    store = ZinguoStore(hass, entry.entry_id)
+    await store.async_load()
+
+    # 所有账号共享同一个连接池、并发上限与错开的轮询节奏
+    fleet = hass.data.get(DATA_FLEET)
+    if fleet is None:
+        fleet = hass.data[DATA_FLEET] = ZinguoFleet()
+
+    # 初始化 API，配置了局域网地址时优先直连
+    local_hosts = [h.strip() for h in entry.data.get(CONF_LOCAL_HOSTS, "").split(",") if h.strip()]
+    api = ZinguoAPI(
+        entry.data["account"], entry.data["password"],
+        token=store.token, on_token=store.async_set_token,
+        local_hosts=local_hosts, session=fleet.session, limiter=fleet.limiter,
+    )
     
     # 初始化协调器 (数据轮询器)
-    polling_interval = entry.data.get("polling_interval", 30)
-    coordinator = ZinguoCoordinator(hass, api, polling_interval)
+    polling_interval = get_option(entry, CONF_POLLING_INTERVAL)
+    state_max_age = get_option(entry, CONF_STATE_MAX_AGE)
+    coordinator = ZinguoCoordinator(hass, api, polling_interval, state_max_age, fleet, store)
+    fleet.register(coordinator)
+    _async_apply_options(entry, coordinator)
+    # 注册表中已有的浴霸交由协调器按连续缺失次数判定移除，不在启动时一次性清理
+    coordinator.async_expect_devices(_registered_macs(hass, entry))
     
-    # 立即获取第一次数据
-    await coordinator.async_config_entry_first_refresh()
+    if store.devices:
+        # 有上次保存的设备快照时直接用它创建实体，云端数据在后台刷新，启动不再等待云端
+        coordinator.async_restore(store.devices)
+    else:
+        # 首次安装没有快照，立即获取第一次数据，失败时释放会话避免连接泄漏
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception:
+            await _async_release(hass, coordinator)
+            raise
     
     # 存储到全局变量
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
         "coordinator": coordinator,
-        "api": api
+        "api": api,
+        "store": store,
     }
     
     # 加载所有子平台
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    async_setup_services(hass)
+
+    # 设备从账号移除后删除其设备注册表条目，实体随之移除；新增设备由各平台补充创建
+    @callback
+    def _async_devices_changed(added, removed):
+        if removed:
+            _async_remove_devices(hass, entry, coordinator.macs)
+
+    entry.async_on_unload(coordinator.async_add_device_listener(_async_devices_changed))
+    # 选项修改后即时应用到运行中的协调器与 API，不重新加载集成
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+    if coordinator.restored:
+        entry.async_create_background_task(hass, coordinator.async_refresh(), f"{DOMAIN}_restore_refresh")
     
     return True
 
@@ -42,5 +93,69 @@ async def async_unload_entry(hass, entry):
     """卸载集成条目"""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
-    return unload_ok
\ No newline at end of file
+        data = hass.data[DOMAIN].pop(entry.entry_id)
+        # 取消排队中的指令并释放长连接会话
+        await data["coordinator"].async_shutdown()
+        await _async_release(hass, data["coordinator"])
+        async_unload_services(hass)
+    return unload_ok
+
+@callback
+def _async_apply_options(entry, coordinator):
+    """把选项应用到协调器、API 与共享的多账号管理器"""
+    api = coordinator.api
+    api.timeout = get_option(entry, CONF_REQUEST_TIMEOUT)
+    if api.local:
+        api.local.timeout = get_option(entry, CONF_LOCAL_TIMEOUT)
+    if coordinator.fleet:
+        # 并发上限为所有账号共享，以最近一次修改为准
+        coordinator.fleet.set_max_concurrency(get_option(entry, CONF_MAX_CONCURRENCY))
+    coordinator.async_apply_options(
+        get_option(entry, CONF_POLLING_INTERVAL),
+        get_option(entry, CONF_POLL_STRATEGY) == POLL_STRATEGY_ADAPTIVE,
+        get_option(entry, CONF_STATE_MAX_AGE),
+        get_option(entry, CONF_REFRESH_DEBOUNCE),
+    )
+
+async def _async_update_listener(hass, entry):
+    data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if data is None:
+        return
+    _LOGGER.debug(f"峥果选项已更新: {dict(entry.options)}")
+    _async_apply_options(entry, data["coordinator"])
+
+def _registered_macs(hass, entry):
+    """本条目在设备注册表中的浴霸 MAC（账号级云端设备除外）"""
+    registry = dr.async_get(hass)
+    return {
+        ident
+        for device in dr.async_entries_for_config_entry(registry, entry.entry_id)
+        for domain, ident in device.identifiers
+        if domain == DOMAIN and ident != entry.entry_id
+    }
+
+@callback
+def _async_remove_devices(hass, entry, macs):
+    """从本条目的设备注册表中移除不在 macs 中的浴霸（账号级云端设备除外）"""
+    registry = dr.async_get(hass)
+    for device in dr.async_entries_for_config_entry(registry, entry.entry_id):
+        ids = {ident for domain, ident in device.identifiers if domain == DOMAIN}
+        if not ids or entry.entry_id in ids or ids & macs:
+            continue
+        _LOGGER.info(f"峥果设备 {sorted(ids)} 已从账号移除，删除对应设备与实体")
+        registry.async_update_device(device.id, remove_config_entry_id=entry.entry_id)
+
+async def _async_release(hass, coordinator):
+    """退出多账号管理；最后一个账号卸载时关闭共享连接池"""
+    await coordinator.api.close()
+    fleet = hass.data.get(DATA_FLEET)
+    if fleet is None:
+        return
+    fleet.unregister(coordinator)
+    if not fleet.members:
+        hass.data.pop(DATA_FLEET)
+        await fleet.close()
+
+async def async_remove_entry(hass, entry):
+    """删除集成条目时清理持久化数据"""
+    await ZinguoStore(hass, entry.entry_id).async_remove()
@@ -1,46 +1,241 @@
 import aiohttp
+import asyncio
 import hashlib
 import time
 import json
 import logging
-from .const import LOGIN_URL, DEVICES_URL, CONTROL_URL, PROTECTION_URL
+from .circuit import CircuitBreaker, CircuitOpenError
+from .decode import ZinguoResponseError, decode_response
+from .metrics import ZinguoMetrics
+from .ratelimit import TokenBucket, PRIORITY_COMMAND
+from .transport import CloudTransport, LocalTransport
+from .const import (
+    BASE_URL, LOGIN_PATH, CLOUD_RESYNC_INTERVAL,
+    REQUEST_TIMEOUT, POLL_QUEUE_MARGIN, CONN_LIMIT, CONN_LIMIT_PER_HOST, DNS_CACHE_TTL, KEEPALIVE_TIMEOUT,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+AUTH_ERROR_STATUS = (401, 403)
+
+class ZinguoAuthError(ZinguoResponseError):
+    """账号认证失败（登录失败或重新登录后令牌仍被拒绝）"""
+    kind = "auth"
+
+def _is_auth_error(status, data):
+    """判断响应是否为令牌失效"""
+    if status in AUTH_ERROR_STATUS:
+        return True
+    if isinstance(data, dict) and "token" not in data:
+        msg = str(data.get("message") or data.get("msg") or "").lower()
+        return data.get("code") in AUTH_ERROR_STATUS or "token" in msg
+    return False
+
+def _not_sent(err):
+    """请求确定没有到达设备：连接未建立，或没有该设备的局域网地址"""
+    return isinstance(err, (aiohttp.ClientConnectorError, KeyError))
+
+def create_session():
+    """创建带连接池、keep-alive 与 DNS 缓存的会话"""
+    connector = aiohttp.TCPConnector(
+        limit=CONN_LIMIT,
+        limit_per_host=CONN_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),  # 10秒超时
+    )
+
 class ZinguoAPI:
-    def __init__(self, account, password):
+    def __init__(self, account, password, token=None, on_token=None, local_hosts=None, session=None, limiter=None,
+                 base_url=BASE_URL):
         self.account = account
+        # 云端地址可替换为本地模拟服务器（见 tools/fake_cloud.py）
+        self.base_url = base_url
         self.password_hash = hashlib.sha1(password.encode()).hexdigest()
-        self.token = None
+        # token 可由持久化存储恢复，on_token 在重新登录后回调以便保存
+        self.token = token
+        self._on_token = on_token
+        self._login_lock = asyncio.Lock()
         self.headers = {
             "User-Agent": "%E5%B3%A5%E6%9E%9C%E6%99%BA%E8%83%BD/2 CFNetwork/1327.0.4 Darwin/21.2.0",
             "Accept": "*/*",
             "Accept-Language": "zh-cn"
         }
+        self._session = None
+        self._shared_session = session
+        # 单次云端请求超时（秒），可在选项中调整
+        self.timeout = REQUEST_TIMEOUT
+        # 云端保护：限流器可由多个账号共享，熔断器按账号独立
+        self.limiter = limiter or TokenBucket()
+        self.breaker = CircuitBreaker()
+        self.metrics = ZinguoMetrics()
+        # 传输通道：云端始终可用，配置了局域网地址时优先直连
+        self.cloud = CloudTransport(self)
+        self.local = LocalTransport(self, local_hosts) if local_hosts else None
+        # 最近一次云端全量同步得到的设备列表，用于判断局域网是否覆盖全部设备
+        self.known_macs = set()
+        self._last_cloud_sync = None
+        # 最近一次 get_devices 是否返回了账号下的全部设备（仅局域网兜底时可能缺少设备）
+        self.complete = True
+
+    @property
+    def session(self):
+        """长连接会话：复用 TCP/TLS 连接并缓存 DNS，首次使用时创建；多账号模式下使用共享会话"""
+        if self._shared_session is not None:
+            return self._shared_session
+        if self._session is None or self._session.closed:
+            self._session = create_session()
+        return self._session
+
+    async def close(self):
+        """关闭自有连接池，在卸载集成时调用；共享会话由多账号管理器关闭"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _send(self, method, url, priority=PRIORITY_COMMAND, **kwargs):
+        """经过熔断器与限流器发送一次云端请求，返回 (状态码, 解析后的数据)"""
+        if not self.breaker.allow():
+            raise CircuitOpenError("峥果云端熔断中，暂停请求")
+        sent = ok = False
+        try:
+            await self.limiter.acquire(priority)
+            sent = True
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with self.session.request(method, url, timeout=timeout, **kwargs) as resp:
+                status = resp.status
+                body = await resp.read()
+            # 服务端仍能正常应答（含限流与解析失败）时不计入熔断
+            ok = status < 500
+            return status, decode_response(status, resp.content_type, body)
+        finally:
+            # 网络错误、超时与服务端错误计入熔断；在限流器排队时被取消（整体超时或调用方取消）不计入
+            if not sent:
+                self.breaker.release()
+            elif ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
 
     async def login(self):
         payload = {"account": self.account, "password": self.password_hash}
         headers = {**self.headers, "Content-Type": "text/plain;charset=UTF-8"}
-        timeout = aiohttp.ClientTimeout(total=10)  # 10秒超时
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(LOGIN_URL, data=json.dumps(payload), headers=headers) as resp:
-                data = await resp.json(content_type=None)
-                self.token = data.get("token")
+        with self.metrics.measure("login"):
+            _, data = await self._send("POST", self.base_url + LOGIN_PATH, data=json.dumps(payload), headers=headers)
+        token = data.get("token") if isinstance(data, dict) else None
+        if not token:
+            raise ZinguoAuthError(f"峥果账号登录失败: {data}")
+        self.token = token
+        if self._on_token:
+            self._on_token(token)
+        return token
+
+    async def _ensure_token(self, stale=None):
+        """单飞登录：并发调用方共享同一次登录，stale 为调用方已确认失效的令牌"""
+        async with self._login_lock:
+            # 排队期间其他调用方已完成登录，直接复用新令牌
+            if self.token and self.token != stale:
                 return self.token
+            return await self.login()
+
+    async def _request(self, method, url, payload=None, priority=PRIORITY_COMMAND):
+        """携带令牌发送请求；检测到令牌失效时重新登录一次并重试原请求"""
+        for attempt in range(2):
+            token = self.token or await self._ensure_token()
+            headers = {**self.headers, "x-access-token": str(token)}
+            body = None
+            if payload is not None:
+                headers["Content-Type"] = "text/plain;charset=UTF-8"
+                body = json.dumps(payload)
+            status, data = await self._send(method, url, priority, data=body, headers=headers)
+            if not _is_auth_error(status, data):
+                return data
+            if attempt == 0:
+                _LOGGER.info("峥果令牌已失效，重新登录后重试")
+                await self._ensure_token(stale=token)
+        raise ZinguoAuthError(f"重新登录后令牌仍被拒绝: {data}")
+
+    @property
+    def poll_timeout(self):
+        """一次轮询的总超时：局域网读取、令牌失效时的请求 + 重新登录 + 重试，再加排队等待"""
+        budget = 3 * self.timeout + POLL_QUEUE_MARGIN
+        if self.local:
+            budget += self.local.timeout
+        return budget
+
+    @property
+    def transports(self):
+        return [t for t in (self.local, self.cloud) if t]
+
+    async def _failover(self, transports, op, *args, repeatable=True):
+        """依次尝试各通道，失败时自动切换到下一个；降级中的通道排到最后兜底
+
+        repeatable 为 False 的指令（开关翻转）重复发送会再次翻转，只有确定请求未发出时
+        （无法建立连接、没有该设备的局域网地址）才切换通道，其余失败直接抛出，由调用方重新读取状态。
+        """
+        transports = sorted(transports, key=lambda t: not t.available)
+        for i, transport in enumerate(transports):
+            try:
+                result = await getattr(transport, op)(*args)
+            except Exception as err:
+                transport.record_failure()
+                if i == len(transports) - 1 or not (repeatable or _not_sent(err)):
+                    raise
+                _LOGGER.debug(f"{transport.name} 通道 {op} 失败，切换通道: {err}")
+                continue
+            transport.record_success()
+            return result
+
+    def _route(self, mac):
+        """指令通道：设备在局域网内时优先直连，云端兜底"""
+        if self.local and self.local.has(mac):
+            return [self.local, self.cloud]
+        return [self.cloud]
 
     async def get_devices(self):
-        if not self.token: await self.login()
-        headers = {**self.headers, "x-access-token": str(self.token)}
-        url = f"{DEVICES_URL}?tt={int(time.time()*1000)}"
-        timeout = aiohttp.ClientTimeout(total=10)  # 10秒超时
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(url, headers=headers) as resp:
-                # 处理由于 mimetype 不标准导致的解析错误
-                return await resp.json(content_type=None)
+        with self.metrics.measure("get_devices"):
+            return await self._get_devices()
+
+    async def _get_devices(self):
+        self.complete = True
+        if not self.local:
+            return await self._failover([self.cloud], "get_devices")
+
+        local_devs = []
+        if self.local.available:
+            try:
+                local_devs = await self.local.get_devices()
+                self.local.record_success()
+            except Exception as err:
+                self.local.record_failure()
+                _LOGGER.debug(f"局域网读取失败，改用云端: {err}")
+
+        # 局域网已覆盖全部设备且未到全量同步时间时，无需访问云端
+        now = time.monotonic()
+        local_macs = {dev["mac"] for dev in local_devs}
+        if (local_devs and self.known_macs <= local_macs and self._last_cloud_sync is not None
+                and now - self._last_cloud_sync < CLOUD_RESYNC_INTERVAL):
+            return local_devs
+
+        try:
+            devices = await self.cloud.get_devices()
+        except Exception:
+            self.cloud.record_failure()
+            if local_devs:
+                self.complete = self.known_macs <= local_macs
+                return local_devs
+            raise
+        self.cloud.record_success()
+        self._last_cloud_sync = now
+        self.known_macs = {dev.get("mac") for dev in devices if isinstance(dev, dict)}
+        # 同一设备以更实时的局域网数据为准
+        local_by_mac = {dev["mac"]: dev for dev in local_devs}
+        return [local_by_mac.get(dev.get("mac"), dev) if isinstance(dev, dict) else dev for dev in devices]
 
     async def send_control(self, payload):
-        if not self.token: await self.login()
-        headers = {**self.headers, "x-access-token": str(self.token), "Content-Type": "text/plain;charset=UTF-8"}
         # 默认结构补齐
         data = {
             "masterUser": self.account,
@@ -50,16 +245,11 @@ class ZinguoAPI:
             "windSwitch": 0, "ventilationSwitch": 0, "turnOffAll": 0,
             **payload
         }
-        timeout = aiohttp.ClientTimeout(total=10)  # 10秒超时
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.put(CONTROL_URL, data=json.dumps(data), headers=headers) as resp:
-                return await resp.json(content_type=None)
+        # 参数写入与全关可安全重发，开关翻转不可
+        repeatable = bool(data["setParamter"]) or data["turnOffAll"] == 1
+        with self.metrics.measure("send_control"):
+            return await self._failover(self._route(data["mac"]), "send_control", data, repeatable=repeatable)
 
     async def set_protection(self, mac, black_setting):
-        if not self.token: await self.login()
-        headers = {**self.headers, "x-access-token": str(self.token), "Content-Type": "text/plain;charset=UTF-8"}
-        payload = {"mac": mac, "blackSetting": black_setting}
-        timeout = aiohttp.ClientTimeout(total=10)  # 10秒超时
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(PROTECTION_URL, data=json.dumps(payload), headers=headers) as resp:
-                return await resp.json(content_type=None)
+        with self.metrics.measure("set_protection"):
+            return await self._failover(self._route(mac), "set_protection", mac, black_setting)
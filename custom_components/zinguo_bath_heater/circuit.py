@@ -0,0 +1,52 @@
+import time
+from .const import BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """熔断中，请求被直接拒绝"""
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后断开，等待后放行一次半开探测，成功则恢复"""
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return STATE_CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return STATE_HALF_OPEN
+        return STATE_OPEN
+
+    def allow(self):
+        """是否放行请求；半开状态同一时间只放行一个探测请求"""
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release(self):
+        """请求未发出（排队时被取消）：不计成败，归还半开探测名额"""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            # 探测失败或达到阈值，重新计时
+            self.opened_at = time.monotonic()
+        self._probing = False
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from .const import COMMAND_MERGE_WINDOW
+
+_LOGGER = logging.getLogger(__name__)
+
+class ZinguoCommandQueue:
+    """按设备 MAC 排队的控制指令队列
+
+    参数写入 (setParamter: True) 在合并窗口内合并为一次请求；
+    开关翻转指令严格按提交顺序逐条发送。
+    """
+    def __init__(self, api, window=COMMAND_MERGE_WINDOW):
+        self.api = api
+        self.window = window
+        self.requests_sent = 0
+        self.requests_saved = 0
+        self._locks = {}
+        self._pending = {}  # mac -> (合并后的参数 payload, 等待结果的 future 列表)
+        self._timers = {}
+        self._tasks = set()
+
+    def _lock(self, mac):
+        return self._locks.setdefault(mac, asyncio.Lock())
+
+    async def submit(self, payload):
+        """提交一条指令，返回云端响应（合并发送时多个调用方共享同一响应）"""
+        mac = payload["mac"]
+        if not payload.get("setParamter"):
+            # 在让出事件循环前取走已排队的参数写入，与本条翻转一起进入设备锁，
+            # 设备锁按先来先得唤醒，发送顺序与提交顺序一致
+            pending = self._take(mac)
+            try:
+                async with self._lock(mac):
+                    if pending:
+                        taken, pending = pending, None
+                        await self._send_merged(mac, taken)
+                    return await self._send(payload)
+            finally:
+                if pending:
+                    # 等待设备锁时被取消：取走的参数写入未发送，不能让其调用方一直等待
+                    self._cancel(pending[1])
+
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        if mac in self._pending:
+            merged, waiters = self._pending[mac]
+            merged.update(payload)
+            waiters.append(fut)
+            self.requests_saved += 1
+        else:
+            self._pending[mac] = (dict(payload), [fut])
+            self._timers[mac] = loop.call_later(self.window, self._schedule_flush, mac)
+        return await fut
+
+    def _schedule_flush(self, mac):
+        task = asyncio.get_running_loop().create_task(self._flush(mac))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _take(self, mac):
+        """取出该设备已合并的参数写入并取消其定时发送"""
+        timer = self._timers.pop(mac, None)
+        if timer:
+            timer.cancel()
+        return self._pending.pop(mac, None)
+
+    async def _flush(self, mac):
+        """合并窗口结束，发送该设备已合并的参数写入"""
+        pending = self._take(mac)
+        if pending is None:
+            return
+        async with self._lock(mac):
+            await self._send_merged(mac, pending)
+
+    async def _send_merged(self, mac, pending):
+        merged, waiters = pending
+        if len(waiters) > 1:
+            _LOGGER.debug(f"合并 {len(waiters)} 条参数写入 ({mac}): {merged}")
+        try:
+            result = await self._send(merged)
+        except Exception as err:
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_exception(err)
+            return
+        except BaseException:
+            # 发送中被取消，同样通知所有等待方
+            self._cancel(waiters)
+            raise
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(result)
+
+    @staticmethod
+    def _cancel(waiters):
+        for fut in waiters:
+            if not fut.done():
+                fut.cancel()
+
+    async def _send(self, payload):
+        self.requests_sent += 1
+        return await self.api.send_control(payload)
+
+    def close(self):
+        """取消所有未发送的指令，在卸载集成时调用"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for _, waiters in self._pending.values():
+            self._cancel(waiters)
+        self._pending.clear()
+        for task in self._tasks:
+            task.cancel()
@@ -1,6 +1,30 @@
 import voluptuous as vol
 from homeassistant import config_entries
-from .const import DOMAIN, CONF_POLLING_INTERVAL
+from homeassistant.core import callback
+from .const import (
+    DOMAIN, CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL, CONF_STATE_MAX_AGE, DEFAULT_STATE_MAX_AGE,
+    CONF_LOCAL_HOSTS, CONF_MOTO_VERSION, CONF_POLL_STRATEGY, POLL_STRATEGY_ADAPTIVE, POLL_STRATEGY_FIXED,
+    CONF_REQUEST_TIMEOUT, REQUEST_TIMEOUT, CONF_LOCAL_TIMEOUT, LOCAL_TIMEOUT,
+    CONF_MAX_CONCURRENCY, FLEET_MAX_CONCURRENCY, CONF_REFRESH_DEBOUNCE, COMMAND_CONFIRM_DELAY,
+)
+
+# 选项默认值；初始配置中已有的项（轮询间隔、缓存有效期、电机版本）以初始配置为准
+OPTION_DEFAULTS = {
+    CONF_POLL_STRATEGY: POLL_STRATEGY_ADAPTIVE,
+    CONF_POLLING_INTERVAL: DEFAULT_POLLING_INTERVAL,
+    CONF_STATE_MAX_AGE: DEFAULT_STATE_MAX_AGE,
+    CONF_REQUEST_TIMEOUT: REQUEST_TIMEOUT,
+    CONF_LOCAL_TIMEOUT: LOCAL_TIMEOUT,
+    CONF_MAX_CONCURRENCY: FLEET_MAX_CONCURRENCY,
+    CONF_REFRESH_DEBOUNCE: COMMAND_CONFIRM_DELAY,
+    CONF_MOTO_VERSION: "2",
+}
+
+def get_option(entry, key):
+    """读取配置项：选项优先，其次初始配置，最后为默认值"""
+    if key in entry.options:
+        return entry.options[key]
+    return entry.data.get(key, OPTION_DEFAULTS.get(key))
 
 class ZinguoConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
@@ -13,7 +37,48 @@ class ZinguoConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=vol.Schema({
                 vol.Required("account"): str,
                 vol.Required("password"): str,
-                vol.Required("moto_version", default="2"): vol.In({"1": "单电机", "2": "双电机"}),
+                vol.Required(CONF_MOTO_VERSION, default="2"): vol.In({"1": "单电机", "2": "双电机"}),
                 vol.Optional(CONF_POLLING_INTERVAL, default=30): int,
+                vol.Optional(CONF_STATE_MAX_AGE, default=DEFAULT_STATE_MAX_AGE): int,
+                vol.Optional(CONF_LOCAL_HOSTS, default=""): str,
+            })
+        )
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return ZinguoOptionsFlow(config_entry)
+
+class ZinguoOptionsFlow(config_entries.OptionsFlow):
+    """运行参数选项，保存后由 __init__ 中的更新监听即时应用，不重新加载集成"""
+    def __init__(self, config_entry):
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        def default(key):
+            return {"default": get_option(self._entry, key)}
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Required(CONF_POLL_STRATEGY, **default(CONF_POLL_STRATEGY)): vol.In({
+                    POLL_STRATEGY_ADAPTIVE: "自适应", POLL_STRATEGY_FIXED: "固定间隔",
+                }),
+                vol.Required(CONF_POLLING_INTERVAL, **default(CONF_POLLING_INTERVAL)):
+                    vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Required(CONF_STATE_MAX_AGE, **default(CONF_STATE_MAX_AGE)):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=600)),
+                vol.Required(CONF_REQUEST_TIMEOUT, **default(CONF_REQUEST_TIMEOUT)):
+                    vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
+                vol.Required(CONF_LOCAL_TIMEOUT, **default(CONF_LOCAL_TIMEOUT)):
+                    vol.All(vol.Coerce(int), vol.Range(min=1, max=30)),
+                vol.Required(CONF_MAX_CONCURRENCY, **default(CONF_MAX_CONCURRENCY)):
+                    vol.All(vol.Coerce(int), vol.Range(min=1, max=32)),
+                vol.Required(CONF_REFRESH_DEBOUNCE, **default(CONF_REFRESH_DEBOUNCE)):
+                    vol.All(vol.Coerce(float), vol.Range(min=0.5, max=60)),
+                vol.Required(CONF_MOTO_VERSION, **default(CONF_MOTO_VERSION)): vol.In({"1": "单电机", "2": "双电机"}),
             })
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,68 @@
+import logging
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from .const import COMMAND_CONFIRM_DELAY, CONFIRM_MAX_RETRIES
+
+_LOGGER = logging.getLogger(__name__)
+
+class ConfirmationScheduler:
+    """指令后的确认刷新
+
+    多条指令的确认合并为一次拉取，新指令会重新开始等待窗口；
+    云端状态与期望一致或达到重试上限后停止。
+    """
+    def __init__(self, coordinator, delay=COMMAND_CONFIRM_DELAY, max_retries=CONFIRM_MAX_RETRIES):
+        self.coordinator = coordinator
+        self.delay = delay
+        self.max_retries = max_retries
+        self._expected = {}  # mac -> {字段: 期望值}，字段规则同 DeviceState.value()
+        self._retries = 0
+        self._unsub = None
+        self._task = None
+
+    def __contains__(self, mac):
+        return mac in self._expected
+
+    @callback
+    def schedule(self, mac, expected):
+        self._expected.setdefault(mac, {}).update(expected)
+        self._retries = 0
+        self._restart()
+
+    @callback
+    def _restart(self):
+        if self._unsub:
+            self._unsub()
+        self._unsub = async_call_later(self.coordinator.hass, self.delay, self._fire)
+
+    @callback
+    def _fire(self, _now):
+        self._unsub = None
+        self._task = self.coordinator.hass.async_create_task(self._confirm())
+
+    async def _confirm(self):
+        await self.coordinator.async_refresh_for("confirm")
+        # 与云端原始状态比较，乐观预测叠加后的数据不能作为确认依据
+        polled = self.coordinator.polled
+        for mac, expected in list(self._expected.items()):
+            dev = polled.get(mac)
+            if dev is None or all(dev.value(f) == v for f, v in expected.items()):
+                del self._expected[mac]
+        if not self._expected:
+            return
+        self._retries += 1
+        if self._retries >= self.max_retries:
+            _LOGGER.debug(f"确认刷新达到重试上限，以云端状态为准: {list(self._expected)}")
+            self._expected.clear()
+            return
+        self._restart()
+
+    @callback
+    def cancel(self):
+        """取消等待中的确认刷新，在卸载集成时调用"""
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._expected.clear()
@@ -1,9 +1,87 @@
 DOMAIN = "zinguo_bath_heater"
 CONF_POLLING_INTERVAL = "polling_interval"
 DEFAULT_POLLING_INTERVAL = 30
+# 缓存状态在该时长（秒）内视为新鲜，开关操作无需先拉取云端
+CONF_STATE_MAX_AGE = "state_max_age"
+DEFAULT_STATE_MAX_AGE = 10
+# 指令发出后云端状态生效所需时间（秒），早于此时间的轮询结果不作为确认
+COMMAND_CONFIRM_DELAY = 3
+# 确认刷新的最大重试次数，超过后以云端状态为准
+CONFIRM_MAX_RETRIES = 3
 
 BASE_URL = "https://iot.zinguo.com/api/v1"
-LOGIN_URL = f"{BASE_URL}/customer/login"
-DEVICES_URL = f"{BASE_URL}/customer/devices"
-CONTROL_URL = f"{BASE_URL}/wifiyuba/yuBaControl"
-PROTECTION_URL = f"{BASE_URL}/wifiyuba/temperatureProtection"
+LOGIN_PATH = "/customer/login"
+DEVICES_PATH = "/customer/devices"
+CONTROL_PATH = "/wifiyuba/yuBaControl"
+PROTECTION_PATH = "/wifiyuba/temperatureProtection"
+
+# 局域网直连：浴霸（或局域网桥接）的地址，多个用逗号分隔，如 "192.168.1.20,192.168.1.21:8080"
+CONF_LOCAL_HOSTS = "local_hosts"
+LOCAL_STATUS_PATH = "/api/v1/status"
+LOCAL_CONTROL_PATH = "/api/v1/control"
+LOCAL_PROTECTION_PATH = "/api/v1/protection"
+LOCAL_TIMEOUT = 3
+# 仅使用局域网读取时，每隔该时长（秒）仍向云端全量同步一次以发现新设备
+CLOUD_RESYNC_INTERVAL = 600
+# 通道健康评分：指数加权成功率，低于阈值时降级，冷却后重新探测
+HEALTH_ALPHA = 0.3
+HEALTH_THRESHOLD = 0.5
+TRANSPORT_RETRY_AFTER = 30
+
+# HTTP 连接池配置
+REQUEST_TIMEOUT = 10
+# 一次轮询在单个请求超时之外，留给限流与共享并发排队的等待时间（秒）
+POLL_QUEUE_MARGIN = 10
+CONN_LIMIT = 20
+CONN_LIMIT_PER_HOST = 8
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+# 持久化存储
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+
+# 参数写入合并窗口（秒）
+COMMAND_MERGE_WINDOW = 0.3
+
+# 自适应轮询（秒）：设备活动或指令后快速轮询，长时间空闲后降频，云端故障时指数退避
+FAST_POLL_INTERVAL = 5
+ACTIVE_WINDOW = 60
+IDLE_AFTER = 600
+IDLE_POLL_INTERVAL = 300
+MAX_BACKOFF_INTERVAL = 600
+
+# 多账号共享：全局 hass.data 键、并发拉取上限、账号间轮询错开步长（秒）
+DATA_FLEET = f"{DOMAIN}_fleet"
+FLEET_MAX_CONCURRENCY = 4
+FLEET_STAGGER_STEP = 2
+# 熔断：连续失败次数阈值与半开探测前的等待时间（秒）
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_TIMEOUT = 60
+
+# 乐观状态的最长保留时间（秒），超时仍未被云端确认则以云端为准
+OPTIMISTIC_TIMEOUT = 15
+
+# 云端限流（令牌桶）：每秒补充的请求数、桶容量、为用户指令保留的令牌数
+RATE_LIMIT_PER_SECOND = 2
+RATE_LIMIT_BURST = 10
+RATE_LIMIT_COMMAND_RESERVE = 2
+
+# 批量设置状态服务的指令并发上限
+APPLY_STATE_CONCURRENCY = 4
+
+# 温度历史：每台设备保留的样本数
+HISTORY_SIZE = 120
+
+# 连续失败达到该次数才将轮询标记为失败，此前沿用上次的设备状态
+BAD_POLL_TOLERANCE = 3
+
+# 选项（可在集成选项中修改，运行中即时生效；未设置时沿用初始配置或默认值）
+CONF_MOTO_VERSION = "moto_version"
+CONF_POLL_STRATEGY = "poll_strategy"
+POLL_STRATEGY_ADAPTIVE = "adaptive"
+POLL_STRATEGY_FIXED = "fixed"
+CONF_REQUEST_TIMEOUT = "request_timeout"
+CONF_LOCAL_TIMEOUT = "local_timeout"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_REFRESH_DEBOUNCE = "refresh_debounce"
@@ -1,13 +1,82 @@
 from datetime import timedelta
+import asyncio
 import logging
+import time
 import async_timeout
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from .api import ZinguoAuthError
+from .command_queue import ZinguoCommandQueue
+from .confirm import ConfirmationScheduler
+from .history import TemperatureHistory
+from .model import DeviceState
+from .optimistic import OptimisticEngine
+from .schedule import ScheduleRunner
+from .scheduler import AdaptivePollScheduler
+from .decode import ZinguoMalformedError
+from .const import DEFAULT_STATE_MAX_AGE, HISTORY_SIZE, BAD_POLL_TOLERANCE
 
 _LOGGER = logging.getLogger(__name__)
 
+def diff_devices(old, new):
+    """逐设备、逐字段比较两次快照
+
+    返回 {mac: 变化字段集合}，嵌套字段同时记录 "key" 与 "key.sub"；
+    新增或消失的设备记为 None，表示全部字段变化。
+    """
+    changes = {}
+    for mac in old.keys() | new.keys():
+        a, b = old.get(mac), new.get(mac)
+        if a is b:
+            continue
+        if a is None or b is None:
+            changes[mac] = None
+            continue
+        fields = a.diff(b)
+        if fields:
+            changes[mac] = fields
+    return changes
+
 class ZinguoCoordinator(DataUpdateCoordinator):
-    def __init__(self, hass, api, interval):
+    def __init__(self, hass, api, interval, state_max_age=DEFAULT_STATE_MAX_AGE, fleet=None, store=None):
         self.api = api
+        self.fleet = fleet
+        self.store = store
+        self.state_max_age = state_max_age
+        # mac -> 最近一次从云端拉取到该设备的开始时间 (monotonic)；部分响应中缺失的设备不更新
+        self.last_fetch = {}
+        # 连续失败的轮询次数，未达到上限前沿用上次的状态
+        self.bad_polls = 0
+        # 进行中的按需拉取，并发的 async_ensure_fresh 共享同一次
+        self._fetching = None
+        # 所有控制指令经由该队列发送，合并同一设备的参数写入
+        self.commands = ZinguoCommandQueue(api)
+        self.scheduler = AdaptivePollScheduler(interval)
+        self.confirmations = ConfirmationScheduler(self)
+        self.optimistic = OptimisticEngine(self)
+        self.schedules = ScheduleRunner(self)
+        # 本次刷新的触发来源，用于统计；首次为启动刷新，之后定时轮询为 "poll"
+        self._trigger = "startup"
+        # 最近一次轮询得到的云端原始状态（未叠加乐观预测），用于确认指令
+        self.polled = {}
+        # 当前数据来自持久化快照、尚未被云端刷新
+        self.restored = False
+        # 账号下已知的设备，以及本次轮询新增、移除的设备（通知后清空）
+        self.macs = set()
+        self._added = set()
+        self._removed = set()
+        # mac -> 连续缺失的完整轮询次数，达到 BAD_POLL_TOLERANCE 才判定移除
+        self._absent = {}
+        self._device_listeners = []
+        # mac -> 温度历史环形缓冲，每次成功轮询写入一个样本
+        self.history = {}
+        # 上次通知监听者时的快照与本次变化；None 表示全部视为变化
+        self._snapshot = {}
+        self._last_success = None
+        self._was_restored = False
+        self.changes = None
+        self.state_writes = 0
+        self.skipped_writes = 0
         super().__init__(
             hass,
             _LOGGER,
@@ -15,12 +84,239 @@ class ZinguoCoordinator(DataUpdateCoordinator):
             update_interval=timedelta(seconds=interval)
         )
 
+    async def async_refresh_for(self, trigger):
+        """按指定触发来源执行一次刷新"""
+        self._trigger = trigger
+        await self.async_refresh()
+
     async def _async_update_data(self):
+        self.api.metrics.refreshes[self._trigger] += 1
+        self._trigger = "poll"
+        started = time.monotonic()
+        deadline = async_timeout.timeout(self.api.poll_timeout)
         try:
-            async with async_timeout.timeout(10):
-                devices = await self.api.get_devices()
-                if not isinstance(devices, list):
-                    return {}
-                return {dev["mac"]: dev for dev in devices}
+            async with deadline:
+                if self.fleet:
+                    devices = await self.fleet.run(self, self.api.get_devices)
+                else:
+                    devices = await self.api.get_devices()
+            if not isinstance(devices, list):
+                raise ZinguoMalformedError(f"设备列表格式异常: {str(devices)[:200]}")
+        except ZinguoAuthError as err:
+            # 认证失败不会自行恢复，立即标记失败
+            self._set_interval(self.scheduler.on_failure())
+            raise UpdateFailed(f"峥果账号认证失败: {err}") from err
         except Exception as err:
-            raise UpdateFailed(f"无法同步峥果服务器数据: {err}")
\ No newline at end of file
+            self._set_interval(self.scheduler.on_failure())
+            self.bad_polls += 1
+            kind = "timeout" if isinstance(err, asyncio.TimeoutError) else getattr(err, "kind", "error")
+            if deadline.expired:
+                # 整体超时会取消进行中的请求 (CancelledError)，api 的埋点记录不到，在此补记
+                self.api.metrics.timeouts["get_devices"] += 1
+                self.api.metrics.error_kinds["timeout"] += 1
+            if self.data and self.bad_polls < BAD_POLL_TOLERANCE:
+                # 偶发的失败不让所有实体变为不可用，沿用上次的状态
+                _LOGGER.debug(f"同步峥果服务器数据失败 ({kind}, 第 {self.bad_polls} 次)，沿用上次状态: {err}")
+                return self.data
+            raise UpdateFailed(f"无法同步峥果服务器数据 ({kind}): {err}") from err
+        self.bad_polls = 0
+        # 每次轮询只解析一次，实体直接读取 DeviceState
+        entries = [dev for dev in devices if isinstance(dev, dict) and "mac" in dev]
+        fresh = {dev["mac"]: DeviceState.from_dict(dev) for dev in entries}
+        self.last_fetch.update(dict.fromkeys(fresh, started))
+        # 空列表不视为完整：云端偶发返回空列表时不能据此判定所有设备被移除
+        complete = self.api.complete and bool(entries) and len(entries) == len(devices)
+        removed = self._track_devices(fresh, complete)
+        polled = dict(fresh)
+        # 部分响应或短暂缺失的设备沿用上次的状态
+        for mac, state in self.polled.items():
+            if mac not in removed:
+                polled.setdefault(mac, state)
+        self._save_snapshot(polled)
+        self._record_history(fresh, started)
+        self.polled = polled
+        self.restored = False
+        # 尚未被云端确认的乐观状态继续叠加显示，避免界面回跳
+        data = self.optimistic.reconcile(dict(self.polled))
+        interval = self.scheduler.on_success(data)
+        if self.fleet:
+            # 多账号时对齐到本账号的错开槽位，避免同时请求云端
+            interval = self.fleet.stagger(self, interval)
+        self._set_interval(interval)
+        return data
+
+    def _save_snapshot(self, polled):
+        """设备列表或除温度外的字段变化时才安排写盘，避免频繁轮询不断推迟写入"""
+        if self.store is None:
+            return
+        old = self.polled
+        changed = old.keys() != polled.keys() or any(
+            old[mac].diff(state) - {"temperature"} for mac, state in polled.items()
+        )
+        self.store.async_set_devices(polled, changed)
+
+    @callback
+    def async_restore(self, devices):
+        """以持久化快照作为初始数据，不访问云端；last_fetch 保持为空，指令发出前仍会先拉取"""
+        self.polled = {
+            dev["mac"]: DeviceState.from_dict(dev)
+            for dev in devices if isinstance(dev, dict) and "mac" in dev
+        }
+        self.restored = True
+        self.macs = set(self.polled)
+        self.data = dict(self.polled)
+
+    @callback
+    def async_expect_devices(self, macs):
+        """登记设备注册表中已有的设备，它们同样需连续多次缺失才判定移除"""
+        for mac in macs:
+            self._absent.setdefault(mac, 0)
+
+    def _track_devices(self, fresh, complete):
+        """记录新增与移除的设备，返回本次判定移除的设备
+
+        只有完整的设备列表才计入缺失次数，连续 BAD_POLL_TOLERANCE 次缺失才判定移除，
+        避免云端偶发返回不全的列表时删除设备与实体。
+        """
+        macs = fresh.keys()
+        self._added |= macs - self.macs
+        self.macs |= macs
+        for mac in macs:
+            self._absent.pop(mac, None)
+        if not complete:
+            return set()
+        removed = set()
+        for mac in (self.macs | self._absent.keys()) - macs:
+            self._absent[mac] = self._absent.get(mac, 0) + 1
+            if self._absent[mac] >= BAD_POLL_TOLERANCE:
+                removed.add(mac)
+        for mac in removed:
+            del self._absent[mac]
+            self.history.pop(mac, None)
+            self.last_fetch.pop(mac, None)
+        self.macs -= removed
+        self._removed |= removed
+        return removed
+
+    def _record_history(self, polled, when):
+        for mac, state in polled.items():
+            try:
+                value = float(state.temperature)
+            except (TypeError, ValueError):
+                continue
+            history = self.history.get(mac)
+            if history is None:
+                history = self.history[mac] = TemperatureHistory(HISTORY_SIZE)
+            history.append(when, value)
+
+    @callback
+    def async_add_device_listener(self, listener):
+        """listener(added, removed) 在账号下的设备增减时调用，返回取消订阅的函数"""
+        self._device_listeners.append(listener)
+
+        @callback
+        def remove():
+            self._device_listeners.remove(listener)
+        return remove
+
+    @callback
+    def async_apply_state(self, mac, state):
+        """乐观更新单台设备：只复制外层字典，其余设备对象共享"""
+        data = dict(self.data)
+        data[mac] = state
+        self.async_set_updated_data(data)
+
+    @callback
+    def async_update_listeners(self):
+        """通知实体前先计算与上次快照的差异"""
+        data = self.data or {}
+        if self.last_update_success != self._last_success or self.restored != self._was_restored:
+            # 可用性或恢复标记变化时所有实体都需要写入状态
+            self.changes = None
+        else:
+            self.changes = diff_devices(self._snapshot, data)
+        self._snapshot = data
+        self._last_success = self.last_update_success
+        self._was_restored = self.restored
+        super().async_update_listeners()
+        if self._added or self._removed:
+            added, removed = self._added, self._removed
+            self._added, self._removed = set(), set()
+            _LOGGER.debug(f"峥果账号设备变化: 新增 {sorted(added)}，移除 {sorted(removed)}")
+            for listener in list(self._device_listeners):
+                listener(added, removed)
+
+    def has_changed(self, mac, fields):
+        """fields 为 None 时关注设备的全部字段"""
+        if self.changes is None:
+            return True
+        if mac not in self.changes:
+            return False
+        changed = self.changes[mac]
+        if changed is None or fields is None:
+            return True
+        return any(f in changed for f in fields)
+
+    def _set_interval(self, seconds):
+        self.update_interval = timedelta(seconds=seconds)
+
+    @callback
+    def async_apply_options(self, interval, adaptive, state_max_age, refresh_debounce):
+        """运行中调整轮询策略、缓存有效期与确认刷新的等待窗口，实体无需重建"""
+        self.scheduler.base = interval
+        self.scheduler.adaptive = adaptive
+        self.state_max_age = state_max_age
+        self.confirmations.delay = refresh_debounce
+        self._set_interval(interval)
+        if self._listeners:
+            # 立即按新间隔重新排程，不必等待旧的（可能很长的）间隔结束
+            self._schedule_refresh()
+
+    def mark_command(self, mac, expected):
+        """记录已发送但尚未确认的指令：安排确认刷新并切换到快速轮询
+
+        expected 为 {字段: 期望值}，字段规则同 DeviceState.value()
+        """
+        self.confirmations.schedule(mac, expected)
+        self._set_interval(self.scheduler.on_command())
+        if self._listeners:
+            # 立即按快速间隔重新排程；乐观更新可能被跳过（无变化或指令失败）
+            self._schedule_refresh()
+
+    def is_fresh(self, mac):
+        fetched = self.last_fetch.get(mac)
+        if mac in self.confirmations or fetched is None:
+            return False
+        return time.monotonic() - fetched < self.state_max_age
+
+    async def async_ensure_fresh(self, mac):
+        """仅在缓存状态过期或有未确认指令时才拉取云端
+
+        单飞：已有进行中的拉取时等待它完成后重新判断，仍然过期才再拉取一次，
+        同时等待的调用方共享这次拉取；调用方被取消不会中断拉取。
+        """
+        if self.is_fresh(mac):
+            return
+        if self._fetching is not None:
+            # 进行中的拉取可能早于本次需要的状态，完成后重新判断
+            await asyncio.shield(self._fetching)
+            if self.is_fresh(mac):
+                return
+        if self._fetching is None:
+            self._fetching = self.hass.async_create_task(self._async_fetch())
+        await asyncio.shield(self._fetching)
+
+    async def _async_fetch(self):
+        try:
+            await self.async_refresh_for("stale_state")
+        finally:
+            self._fetching = None
+
+    async def async_shutdown(self):
+        if self._fetching is not None:
+            self._fetching.cancel()
+        self.confirmations.cancel()
+        self.schedules.cancel()
+        self.optimistic.clear()
+        self.commands.close()
+        await super().async_shutdown()
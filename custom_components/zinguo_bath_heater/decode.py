@@ -0,0 +1,50 @@
+"""响应解码：先按状态码与内容类型快速分类，再直接从字节解析 JSON（优先使用 orjson）"""
+import json
+
+try:
+    import orjson
+    _loads = orjson.loads
+    _DECODE_ERRORS = (orjson.JSONDecodeError, UnicodeDecodeError)
+except ImportError:
+    _loads = json.loads
+    _DECODE_ERRORS = (ValueError, UnicodeDecodeError)
+
+THROTTLED_STATUS = 429
+
+class ZinguoResponseError(Exception):
+    """云端或局域网响应异常，kind 用于埋点分类"""
+    kind = "error"
+
+class ZinguoThrottledError(ZinguoResponseError):
+    """请求过于频繁 (429)"""
+    kind = "throttled"
+
+class ZinguoServerError(ZinguoResponseError):
+    """服务端错误 (5xx 或响应体中的错误码)"""
+    kind = "server"
+
+class ZinguoMalformedError(ZinguoResponseError):
+    """响应不是预期的 JSON（HTML 错误页、截断的响应体、结构不符等）"""
+    kind = "malformed"
+
+def decode_response(status, content_type, body):
+    """按状态码分类后解析响应体，返回解析后的数据
+
+    云端的 mimetype 不标准（常为 text/plain），因此只拒绝明显的 HTML；
+    401/403 的响应体无法解析时返回 None，由调用方按状态码判定令牌失效。
+    """
+    if status == THROTTLED_STATUS:
+        raise ZinguoThrottledError(f"请求过于频繁 (HTTP {status})")
+    if status >= 500:
+        raise ZinguoServerError(f"服务端错误 (HTTP {status})")
+    stripped = body.lstrip()
+    if not stripped or "html" in (content_type or "") or stripped[:1] == b"<":
+        if status in (401, 403):
+            return None
+        raise ZinguoMalformedError(f"响应不是 JSON (HTTP {status}, {content_type}, {len(body)} 字节)")
+    try:
+        return _loads(body)
+    except _DECODE_ERRORS as err:
+        if status in (401, 403):
+            return None
+        raise ZinguoMalformedError(f"JSON 解析失败 (HTTP {status}, {len(body)} 字节): {err}") from err
@@ -0,0 +1,36 @@
+from homeassistant.components.diagnostics import async_redact_data
+from .const import DOMAIN
+
+TO_REDACT = {"account", "password", "token", "masterUser"}
+
+async def async_get_config_entry_diagnostics(hass, entry):
+    """诊断信息：埋点统计、轮询与指令队列状态、通道健康度与设备快照"""
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator, api = data["coordinator"], data["api"]
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "metrics": api.metrics.as_dict(),
+        "polling": {
+            "update_interval": coordinator.update_interval.total_seconds() if coordinator.update_interval else None,
+            "last_update_success": coordinator.last_update_success,
+            "bad_polls": coordinator.bad_polls,
+            "state_writes": coordinator.state_writes,
+            "skipped_writes": coordinator.skipped_writes,
+        },
+        "commands": {
+            "requests_sent": coordinator.commands.requests_sent,
+            "requests_saved": coordinator.commands.requests_saved,
+            "schedule_timers": {mac: coordinator.schedules.pending(mac) for mac in coordinator.data or {}},
+        },
+        "cloud": {
+            "circuit": api.breaker.state,
+            "consecutive_failures": api.breaker.failures,
+            "rate_limit_tokens": round(api.limiter.tokens, 1),
+            "rate_limited_requests": api.limiter.throttled,
+        },
+        "transports": {t.name: round(t.health, 3) for t in api.transports},
+        "devices": {mac: state.as_dict() for mac, state in (coordinator.data or {}).items()},
+    }
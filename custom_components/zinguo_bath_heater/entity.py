@@ -0,0 +1,76 @@
+from homeassistant.core import callback
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .const import DOMAIN
+from .model import DeviceState
+
+def account_device_info(entry):
+    """账号级（云端服务）设备，挂载诊断类实体"""
+    return {
+        "identifiers": {(DOMAIN, entry.entry_id)},
+        "name": f"峥果云端 ({entry.title})",
+        "manufacturer": "Zinguo",
+        "entry_type": DeviceEntryType.SERVICE,
+    }
+
+@callback
+def async_setup_device_entities(coordinator, entry, async_add_entities, factory):
+    """为现有设备创建实体，并在之后轮询发现新设备时补充创建
+
+    factory(mac) 返回该设备的实体列表；设备移除时由 __init__ 从设备注册表删除，实体随之移除。
+    """
+    async_add_entities([entity for mac in coordinator.data for entity in factory(mac)])
+
+    @callback
+    def _async_devices_changed(added, removed):
+        if added:
+            async_add_entities([entity for mac in added for entity in factory(mac)])
+
+    entry.async_on_unload(coordinator.async_add_device_listener(_async_devices_changed))
+
+class ZinguoEntity(CoordinatorEntity):
+    """所有平台共用的实体基类：由协调器推送更新，按字段订阅，只在关注的字段变化时写入状态
+
+    _watch 为关注的字段（嵌套字段写作 "blackSetting.status"），
+    None 表示关注该设备的全部字段，空元组表示只关注可用性变化。
+    """
+    _watch = None
+
+    def __init__(self, coordinator, mac, key, name):
+        super().__init__(coordinator)
+        self.mac = mac
+        self._attr_name = f"浴霸 {name} ({mac[-4:]})"
+        self._attr_unique_id = f"zinguo_{mac}_{key}"
+
+    @property
+    def available(self):
+        return super().available and self.mac in self.coordinator.data
+
+    @property
+    def device(self):
+        """协调器中该设备的最新状态，设备缺失时返回默认值"""
+        return self.coordinator.data.get(self.mac) or DeviceState(self.mac)
+
+    @property
+    def extra_state_attributes(self):
+        # 状态来自上次保存的快照，尚未被云端刷新
+        if self.coordinator.restored:
+            return {"restored": True}
+        return None
+
+    @property
+    def device_info(self):
+        """关联到同一台浴霸设备"""
+        return {
+            "identifiers": {(DOMAIN, self.mac)},
+            "name": "峥果浴霸",
+            "manufacturer": "Zinguo"
+        }
+
+    @callback
+    def _handle_coordinator_update(self):
+        if self.coordinator.has_changed(self.mac, self._watch):
+            self.coordinator.state_writes += 1
+            super()._handle_coordinator_update()
+        else:
+            self.coordinator.skipped_writes += 1
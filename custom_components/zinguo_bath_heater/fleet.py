@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import math
+import time
+from .api import create_session
+from .circuit import CircuitOpenError, STATE_OPEN
+from .const import FLEET_MAX_CONCURRENCY, FLEET_STAGGER_STEP
+from .ratelimit import TokenBucket
+
+_LOGGER = logging.getLogger(__name__)
+
+class ZinguoFleet:
+    """多账号共享管理
+
+    所有配置条目共用一个 HTTP 连接池、限流额度与并发上限；各账号的轮询按槽位错开，
+    避免同时涌向云端；每个账号的 API 有独立的熔断器，故障账号不会拖慢其他账号。
+    """
+    def __init__(self, max_concurrency=FLEET_MAX_CONCURRENCY):
+        self.session = create_session()
+        self.limiter = TokenBucket()
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._slots = {}
+
+    @property
+    def members(self):
+        return list(self._slots)
+
+    def register(self, coordinator):
+        # 沿用空出的最小槽位，保持错开间隔均匀
+        used = set(self._slots.values())
+        self._slots[coordinator] = next(i for i in range(len(used) + 1) if i not in used)
+
+    def unregister(self, coordinator):
+        self._slots.pop(coordinator, None)
+
+    def set_max_concurrency(self, value):
+        """调整并发上限；进行中的拉取在旧信号量上完成，之后的拉取使用新上限"""
+        if value != self.max_concurrency:
+            self.max_concurrency = value
+            self._semaphore = asyncio.Semaphore(value)
+
+    async def run(self, coordinator, func):
+        """在共享并发上限下执行一次拉取；该账号熔断中时直接失败，不占用并发名额"""
+        if coordinator.api.breaker.state == STATE_OPEN and not coordinator.api.local:
+            raise CircuitOpenError(f"{coordinator.api.account} 云端熔断中，跳过本次拉取")
+        async with self._semaphore:
+            return await func()
+
+    def stagger(self, coordinator, seconds):
+        """把轮询间隔对齐到该账号的错开槽位上，返回实际等待秒数"""
+        offset = (self._slots.get(coordinator, 0) * FLEET_STAGGER_STEP) % seconds
+        now = time.time()
+        delay = math.ceil((now - offset) / seconds) * seconds + offset - now
+        return delay if delay >= 1 else delay + seconds
+
+    async def close(self):
+        await self.session.close()
@@ -0,0 +1,117 @@
+"""温度历史：每台浴霸一个定长环形缓冲，派生统计量均增量计算，无需查询 recorder 数据库"""
+from array import array
+from collections import deque
+
+class TemperatureHistory:
+    """定长环形缓冲
+
+    时间与温度存放在 array('d') 中；线性回归所需的各项和随写入与淘汰增量更新，
+    滑动最小值/最大值用单调队列维护，各统计量均为 O(1)。
+    """
+    __slots__ = (
+        "size", "times", "temps", "start", "count", "seq", "origin",
+        "_sum_t", "_sum_y", "_sum_tt", "_sum_ty", "_min", "_max",
+    )
+
+    def __init__(self, size):
+        self.size = size
+        self.times = array("d", bytes(8 * size))
+        self.temps = array("d", bytes(8 * size))
+        self.start = 0
+        self.count = 0
+        # 已写入的样本总数，实体据此判断是否有新样本
+        self.seq = 0
+        # 回归使用相对时间，避免 monotonic 时间过大损失精度
+        self.origin = None
+        self._sum_t = self._sum_y = self._sum_tt = self._sum_ty = 0.0
+        self._min = deque()  # (序号, 温度)，温度递增
+        self._max = deque()  # (序号, 温度)，温度递减
+
+    def __len__(self):
+        return self.count
+
+    def append(self, when, value):
+        if self.origin is None:
+            self.origin = when
+        if self.count == self.size:
+            self._evict()
+        i = (self.start + self.count) % self.size
+        t = when - self.origin
+        self.times[i] = when
+        self.temps[i] = value
+        self.count += 1
+        self._add(t, value)
+        seq = self.seq
+        self.seq += 1
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((seq, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((seq, value))
+
+    def _add(self, t, y, sign=1):
+        self._sum_t += sign * t
+        self._sum_y += sign * y
+        self._sum_tt += sign * t * t
+        self._sum_ty += sign * t * y
+
+    def _evict(self):
+        i = self.start
+        self._add(self.times[i] - self.origin, self.temps[i], -1)
+        oldest = self.seq - self.count
+        if self._min[0][0] == oldest:
+            self._min.popleft()
+        if self._max[0][0] == oldest:
+            self._max.popleft()
+        self.start = (i + 1) % self.size
+        self.count -= 1
+        if self.start == 0:
+            self._rebase()
+
+    def _rebase(self):
+        """每轮转一圈以最早样本为原点重算各项和，消除浮点累计误差"""
+        self.origin = self.times[self.start]
+        self._sum_t = self._sum_y = self._sum_tt = self._sum_ty = 0.0
+        for k in range(self.count):
+            i = (self.start + k) % self.size
+            self._add(self.times[i] - self.origin, self.temps[i])
+
+    @property
+    def last(self):
+        if not self.count:
+            return None
+        return self.temps[(self.start + self.count - 1) % self.size]
+
+    @property
+    def mean(self):
+        return self._sum_y / self.count if self.count else None
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+    @property
+    def slope(self):
+        """最小二乘拟合的变化率（°C/秒），样本不足时为 None"""
+        n = self.count
+        if n < 2:
+            return None
+        var = n * self._sum_tt - self._sum_t * self._sum_t
+        if var <= 0:
+            return None
+        return (n * self._sum_ty - self._sum_t * self._sum_y) / var
+
+    def time_to(self, target):
+        """按当前变化率估算到达 target 的秒数；已到达或不在趋近时为 None"""
+        slope, last = self.slope, self.last
+        if slope is None or last is None or target is None:
+            return None
+        remaining = target - last
+        if remaining == 0 or slope == 0 or (remaining > 0) != (slope > 0):
+            return None
+        return remaining / slope
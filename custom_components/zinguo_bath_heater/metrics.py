@@ -0,0 +1,110 @@
+import asyncio
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# 直方图分桶上限（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONVERGENCE_BUCKETS = (1, 2, 3, 5, 10, 15, 30)
+
+class Histogram:
+    """固定分桶直方图，记录次数、总和、最大值与各桶计数"""
+    __slots__ = ("buckets", "counts", "count", "total", "max")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """按分桶估算分位数，返回所在桶的上限"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean": None if self.mean is None else round(self.mean, 4),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 4),
+            "buckets": {f"le_{b}": n for b, n in zip(self.buckets, self.counts)} | {"inf": self.counts[-1]},
+        }
+
+class ZinguoMetrics:
+    """热路径埋点：各接口耗时、错误与超时次数、按触发来源的刷新次数、乐观状态收敛耗时"""
+    def __init__(self):
+        self.latency = {}
+        self.requests = Counter()
+        self.errors = Counter()
+        # 失败按类型统计：auth / throttled / server / malformed / timeout / 其他
+        self.error_kinds = Counter()
+        self.timeouts = Counter()
+        self.refreshes = Counter()
+        self.convergence = Histogram(CONVERGENCE_BUCKETS)
+        self.rollbacks = 0
+        self.unconfirmed = 0
+
+    @contextmanager
+    def measure(self, endpoint):
+        self.requests[endpoint] += 1
+        start = time.monotonic()
+        try:
+            yield
+        except asyncio.TimeoutError:
+            self.timeouts[endpoint] += 1
+            self.error_kinds["timeout"] += 1
+            raise
+        except Exception as err:
+            self.errors[endpoint] += 1
+            self.error_kinds[getattr(err, "kind", "other")] += 1
+            raise
+        finally:
+            self.latency.setdefault(endpoint, Histogram()).observe(time.monotonic() - start)
+
+    def mean_latency(self, endpoint):
+        hist = self.latency.get(endpoint)
+        return hist.mean if hist else None
+
+    @property
+    def error_rate(self):
+        total = sum(self.requests.values())
+        if not total:
+            return None
+        return (sum(self.errors.values()) + sum(self.timeouts.values())) / total
+
+    def as_dict(self):
+        return {
+            "latency": {name: hist.as_dict() for name, hist in self.latency.items()},
+            "requests": dict(self.requests),
+            "errors": dict(self.errors),
+            "error_kinds": dict(self.error_kinds),
+            "timeouts": dict(self.timeouts),
+            "error_rate": self.error_rate,
+            "refreshes": dict(self.refreshes),
+            "convergence": self.convergence.as_dict(),
+            "rollbacks": self.rollbacks,
+            "unconfirmed": self.unconfirmed,
+        }
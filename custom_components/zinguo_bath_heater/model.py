@@ -0,0 +1,210 @@
+"""设备状态模型：每次轮询解析一次，实体直接读取属性，乐观更新时按写时复制生成新对象"""
+
+SWITCH_KEYS = ("lightSwitch", "windSwitch", "ventilationSwitch", "warmingSwitch1", "warmingSwitch2")
+WARMING_KEYS = ("warmingSwitch1", "warmingSwitch2")
+# 开启时需要快速轮询的开关（照明不计入）
+ACTIVE_KEYS = ("warmingSwitch1", "warmingSwitch2", "windSwitch", "ventilationSwitch")
+PARAM_KEYS = (
+    "ventilationAutoClose", "warmingAutoClose", "overHeatAutoClose",
+    "temperatureCalibration", "comovement", "motoVersion",
+)
+
+# 嵌套设置的接口字段名与属性名
+STRUCT_ATTRS = {"blackSetting": "black_setting", "lightAutoClose": "light_auto_close"}
+
+SWITCH_BITS = {key: 1 << i for i, key in enumerate(SWITCH_KEYS)}
+PARAM_INDEX = {key: i for i, key in enumerate(PARAM_KEYS)}
+ACTIVE_MASK = sum(SWITCH_BITS[key] for key in ACTIVE_KEYS)
+
+def switch_on(value):
+    """1为开，2为关"""
+    return value == 1 or value == "1"
+
+class _Struct:
+    """不可变的嵌套设置，_fields 为 (接口字段名, 属性名, 默认值)"""
+    __slots__ = ()
+    _fields = ()
+
+    def __init__(self, *values):
+        for (_, attr, default), value in zip(self._fields, values or [f[2] for f in self._fields]):
+            object.__setattr__(self, attr, value)
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data if isinstance(data, dict) else {}
+        return cls(*(data.get(key, default) for key, _, default in cls._fields))
+
+    def as_dict(self):
+        return {key: getattr(self, attr) for key, attr, _ in self._fields}
+
+    def get(self, key, default=None):
+        for name, attr, _ in self._fields:
+            if name == key:
+                return getattr(self, attr)
+        return default
+
+    def replace(self, **changes):
+        return type(self)(*(changes.get(attr, getattr(self, attr)) for _, attr, _ in self._fields))
+
+    def with_values(self, values):
+        """values 为 {接口字段名: 值}"""
+        return type(self)(*(values.get(key, getattr(self, attr)) for key, attr, _ in self._fields))
+
+    def diff(self, other, prefix, fields):
+        """把不同的字段以 "prefix" 与 "prefix.key" 的形式加入 fields"""
+        if self is other:
+            return
+        changed = [f"{prefix}.{key}" for key, attr, _ in self._fields if getattr(self, attr) != getattr(other, attr)]
+        if changed:
+            fields.add(prefix)
+            fields.update(changed)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, attr) == getattr(other, attr) for _, attr, _ in self._fields
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 不可修改，请使用 replace()")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.as_dict()})"
+
+class BlackSetting(_Struct):
+    """温控保护（黑屏）设置"""
+    __slots__ = ("status", "open_time", "pause_time")
+    _fields = (("status", "status", False), ("openTime", "open_time", 5), ("pauseTime", "pause_time", 5))
+
+class LightAutoClose(_Struct):
+    """照明定时关闭设置"""
+    __slots__ = ("status", "stop_hour", "stop_minute")
+    _fields = (("status", "status", False), ("stopHour", "stop_hour", 0), ("stopMinute", "stop_minute", 0))
+
+_DEFAULT_PARAMS = (None,) * len(PARAM_KEYS)
+_DEFAULT_BLACK = BlackSetting()
+_DEFAULT_LIGHT = LightAutoClose()
+
+class DeviceState:
+    """单台浴霸的状态
+
+    开关状态解码为位掩码，设备参数为与 PARAM_KEYS 对齐的元组；
+    乐观更新通过 replace / with_switches 生成新对象，未改动的部分与旧对象共享。
+    """
+    __slots__ = ("mac", "name", "temperature", "switches", "params", "black_setting", "light_auto_close")
+
+    def __init__(self, mac, name=None, temperature=None, switches=0, params=_DEFAULT_PARAMS,
+                 black_setting=_DEFAULT_BLACK, light_auto_close=_DEFAULT_LIGHT):
+        self.mac = mac
+        self.name = name
+        self.temperature = temperature
+        self.switches = switches
+        self.params = params
+        self.black_setting = black_setting
+        self.light_auto_close = light_auto_close
+
+    @classmethod
+    def from_dict(cls, dev):
+        """解析 get_devices 返回的单台设备数据"""
+        switches = 0
+        for key, bit in SWITCH_BITS.items():
+            if switch_on(dev.get(key)):
+                switches |= bit
+        return cls(
+            dev["mac"],
+            dev.get("name"),
+            dev.get("temperature"),
+            switches,
+            tuple(dev.get(key) for key in PARAM_KEYS),
+            BlackSetting.from_dict(dev.get("blackSetting")),
+            LightAutoClose.from_dict(dev.get("lightAutoClose")),
+        )
+
+    def as_dict(self):
+        """还原为接口格式（开关 1 为开、2 为关），用于持久化与诊断"""
+        data = {"mac": self.mac, "name": self.name, "temperature": self.temperature}
+        data.update((key, 1 if self.switches & bit else 2) for key, bit in SWITCH_BITS.items())
+        data.update(zip(PARAM_KEYS, self.params))
+        data["blackSetting"] = self.black_setting.as_dict()
+        data["lightAutoClose"] = self.light_auto_close.as_dict()
+        return data
+
+    def is_on(self, key):
+        return bool(self.switches & SWITCH_BITS[key])
+
+    @property
+    def active(self):
+        """取暖、吹风或换气任一开启"""
+        return bool(self.switches & ACTIVE_MASK)
+
+    def param(self, key, default=None):
+        value = self.params[PARAM_INDEX[key]]
+        return default if value is None else value
+
+    def replace(self, **changes):
+        new = object.__new__(DeviceState)
+        for attr in self.__slots__:
+            object.__setattr__(new, attr, changes[attr] if attr in changes else getattr(self, attr))
+        return new
+
+    def with_switches(self, states):
+        """states 为 {开关字段: 是否开启}"""
+        switches = self.switches
+        for key, on in states.items():
+            switches = switches | SWITCH_BITS[key] if on else switches & ~SWITCH_BITS[key]
+        return self.replace(switches=switches)
+
+    def with_params(self, values):
+        params = list(self.params)
+        for key, value in values.items():
+            params[PARAM_INDEX[key]] = value
+        return self.replace(params=tuple(params))
+
+    def value(self, field):
+        """按字段名读取：开关返回是否开启，嵌套字段写作 "blackSetting.status" """
+        if field in SWITCH_BITS:
+            return self.is_on(field)
+        if field in PARAM_INDEX:
+            return self.params[PARAM_INDEX[field]]
+        prefix, _, key = field.partition(".")
+        if prefix in STRUCT_ATTRS:
+            return getattr(self, STRUCT_ATTRS[prefix]).get(key)
+        return getattr(self, field)
+
+    def apply(self, changes):
+        """按 {字段名: 值} 生成新状态，字段名规则同 value()"""
+        switches, params, structs, attrs = {}, {}, {}, {}
+        for field, value in changes.items():
+            if field in SWITCH_BITS:
+                switches[field] = value
+            elif field in PARAM_INDEX:
+                params[field] = value
+            elif "." in field:
+                prefix, _, key = field.partition(".")
+                structs.setdefault(STRUCT_ATTRS[prefix], {})[key] = value
+            else:
+                attrs[field] = value
+        state = self.with_switches(switches) if switches else self
+        if params:
+            state = state.with_params(params)
+        for attr, values in structs.items():
+            attrs[attr] = getattr(state, attr).with_values(values)
+        return state.replace(**attrs) if attrs else state
+
+    def diff(self, other):
+        """返回与 other 不同的字段名集合（接口字段名，嵌套字段为 "blackSetting.status" 形式）"""
+        fields = set()
+        if self.temperature != other.temperature:
+            fields.add("temperature")
+        if self.name != other.name:
+            fields.add("name")
+        flipped = self.switches ^ other.switches
+        if flipped:
+            fields.update(key for key, bit in SWITCH_BITS.items() if flipped & bit)
+        if self.params is not other.params:
+            fields.update(key for key, a, b in zip(PARAM_KEYS, self.params, other.params) if a != b)
+        self.black_setting.diff(other.black_setting, "blackSetting", fields)
+        self.light_auto_close.diff(other.light_auto_close, "lightAutoClose", fields)
+        return fields
+
+    def __repr__(self):
+        return f"DeviceState({self.as_dict()})"
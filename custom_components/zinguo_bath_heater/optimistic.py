@@ -0,0 +1,147 @@
+import logging
+import time
+from .const import OPTIMISTIC_TIMEOUT
+from .model import SWITCH_KEYS
+
+_LOGGER = logging.getLogger(__name__)
+
+# 开关联动规则：(开关, 目标状态) -> 设备要求同时满足的其他开关状态
+LINKAGE_RULES = {
+    # 开取暖 -> 必开吹风
+    ("warmingSwitch1", True): (("windSwitch", True),),
+    ("warmingSwitch2", True): (("windSwitch", True),),
+    # 关吹风 -> 必关取暖
+    ("windSwitch", False): (("warmingSwitch1", False), ("warmingSwitch2", False)),
+}
+
+# 指令编码：1 为翻转，2 为强制关闭
+CMD_TOGGLE = 1
+CMD_FORCE_OFF = 2
+
+def plan_switch(state, key, target_on):
+    """根据规则表同时推导下发指令与预测状态
+
+    返回 (payload, changes)，changes 为 {开关: 是否开启}；
+    联动开启仅在当前关闭时翻转，联动关闭使用强制关闭，不受缓存状态影响。
+    """
+    payload = {key: CMD_TOGGLE}
+    changes = {key: target_on}
+    for dep, dep_on in LINKAGE_RULES.get((key, target_on), ()):
+        if not dep_on:
+            payload[dep] = CMD_FORCE_OFF
+        elif not state.is_on(dep):
+            payload[dep] = CMD_TOGGLE
+        changes[dep] = dep_on
+    return payload, changes
+
+def plan_turn_off_all():
+    return {"turnOffAll": 1}, {key: False for key in SWITCH_KEYS}
+
+def plan_state(state, targets):
+    """把目标状态 {开关: 是否开启} 编译为一条指令，返回 (payload, changes)，无需改动时 payload 为空
+
+    未指定的开关保持不变，联动规则补齐依赖（与指定值矛盾时抛出 ValueError）；
+    需要改动的开关一律翻转，只有关吹风时联动关闭的取暖使用强制关闭（同 plan_switch）；
+    目标全关且需改动多个开关时改用全关指令。
+    """
+    desired = {key: state.is_on(key) for key in SWITCH_KEYS}
+    desired.update(targets)
+    for key, on in targets.items():
+        for dep, dep_on in LINKAGE_RULES.get((key, on), ()):
+            if targets.get(dep, dep_on) != dep_on:
+                raise ValueError(f"{key} 与 {dep} 的目标状态冲突")
+            desired[dep] = dep_on
+    changes = {key: on for key, on in desired.items() if state.is_on(key) != on}
+    if not changes:
+        return {}, {}
+    if len(changes) > 1 and not any(desired.values()):
+        return plan_turn_off_all()
+    payload = {key: CMD_TOGGLE for key in changes}
+    for key, on in changes.items():
+        for dep, dep_on in LINKAGE_RULES.get((key, on), ()):
+            if not dep_on:
+                payload[dep] = CMD_FORCE_OFF
+    return payload, changes
+
+class OptimisticEngine:
+    """乐观状态引擎
+
+    指令发出前立即把预测状态推送到界面，并记录每个字段的待确认值；
+    发送失败时回滚到指令前的值，轮询结果与预测一致时确认，超时则以云端为准。
+    """
+    def __init__(self, coordinator, timeout=OPTIMISTIC_TIMEOUT):
+        self.coordinator = coordinator
+        self.timeout = timeout
+        self._pending = {}  # mac -> {字段: (预测值, 截止时间, 所属指令, 发出时间)}
+
+    def pending(self, mac):
+        return dict(self._pending.get(mac, {}))
+
+    async def async_run(self, mac, changes, send):
+        """乐观执行一条指令：send 为实际下发指令的协程函数，失败时回滚并抛出原异常"""
+        coordinator = self.coordinator
+        state = coordinator.data.get(mac)
+        if state is None:
+            return await send()
+        previous = {field: state.value(field) for field in changes}
+        token = object()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        pending = self._pending.setdefault(mac, {})
+        for field, value in changes.items():
+            pending[field] = (value, deadline, token, started)
+        coordinator.async_apply_state(mac, state.apply(changes))
+        try:
+            result = await send()
+        except Exception:
+            self._rollback(mac, previous, token)
+            # 失败的指令可能已被设备执行（例如响应超时），稍后重新读取真实状态
+            coordinator.confirmations.schedule(mac, {})
+            raise
+        coordinator.mark_command(mac, changes)
+        return result
+
+    def _rollback(self, mac, previous, token):
+        # 只回滚仍由本条指令持有的字段，之后的指令改动的字段保持不变
+        pending = self._pending.get(mac, {})
+        restore = {f: v for f, v in previous.items() if f in pending and pending[f][2] is token}
+        for field in restore:
+            del pending[field]
+        if not pending:
+            self._pending.pop(mac, None)
+        if not restore:
+            return
+        self.coordinator.api.metrics.rollbacks += 1
+        state = self.coordinator.data.get(mac)
+        if state is not None:
+            _LOGGER.debug(f"指令失败，回滚 {mac} 的乐观状态: {restore}")
+            self.coordinator.async_apply_state(mac, state.apply(restore))
+
+    def reconcile(self, data):
+        """用轮询结果核对待确认字段：一致则确认，未超时则保留预测值，超时则以云端为准"""
+        now = time.monotonic()
+        metrics = self.coordinator.api.metrics
+        for mac, pending in list(self._pending.items()):
+            state = data.get(mac)
+            if state is None:
+                del self._pending[mac]
+                continue
+            overlay = {}
+            for field, (value, deadline, _, started) in list(pending.items()):
+                if state.value(field) == value:
+                    # 记录从乐观预测到云端确认的收敛耗时
+                    metrics.convergence.observe(now - started)
+                    del pending[field]
+                elif now >= deadline:
+                    metrics.unconfirmed += 1
+                    del pending[field]
+                else:
+                    overlay[field] = value
+            if overlay:
+                data[mac] = state.apply(overlay)
+            if not pending:
+                del self._pending[mac]
+        return data
+
+    def clear(self):
+        self._pending.clear()
@@ -0,0 +1,47 @@
+import asyncio
+import time
+from .const import RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_COMMAND_RESERVE
+
+# 优先级：用户指令优先于后台轮询
+PRIORITY_COMMAND = 0
+PRIORITY_POLL = 1
+
+class TokenBucket:
+    """带优先级的令牌桶限流
+
+    用户指令可使用全部令牌；后台轮询不能动用为指令保留的令牌，
+    且有指令在排队时让行。
+    """
+    def __init__(self, rate=RATE_LIMIT_PER_SECOND, capacity=RATE_LIMIT_BURST, reserve=RATE_LIMIT_COMMAND_RESERVE):
+        self.rate = rate
+        self.capacity = capacity
+        self.reserve = reserve
+        self.tokens = float(capacity)
+        self.throttled = 0
+        self._updated = time.monotonic()
+        self._waiting_commands = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority=PRIORITY_POLL):
+        is_command = priority == PRIORITY_COMMAND
+        floor = 0 if is_command else self.reserve
+        if is_command:
+            self._waiting_commands += 1
+        try:
+            waited = False
+            while True:
+                self._refill()
+                if self.tokens - 1 >= floor and (is_command or not self._waiting_commands):
+                    self.tokens -= 1
+                    return
+                if not waited:
+                    self.throttled += 1
+                    waited = True
+                await asyncio.sleep(max((1 + floor - self.tokens) / self.rate, 0.05))
+        finally:
+            if is_command:
+                self._waiting_commands -= 1
@@ -0,0 +1,201 @@
+"""定时方案：把按顺序执行的步骤编译为尽量少的设备参数写入与本地定时器
+
+设备自带的自动关闭（取暖、换气的分钟数，照明的关闭时刻）在设备端计时，
+不依赖云端往返；无法由设备参数覆盖的开关动作才使用本地定时器。
+注意：自动关闭参数是设备的持久设置，之后手动开启时同样生效。
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+from functools import partial
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+from .optimistic import LINKAGE_RULES, plan_switch
+
+_LOGGER = logging.getLogger(__name__)
+
+# 服务中的动作名 -> 开关字段
+SCHEDULE_ACTIONS = {
+    "light": "lightSwitch",
+    "wind": "windSwitch",
+    "ventilation": "ventilationSwitch",
+    "warming1": "warmingSwitch1",
+    "warming2": "warmingSwitch2",
+}
+
+# 由设备按分钟自动关闭的开关及其参数（两路取暖共用一个参数）
+AUTO_CLOSE_PARAMS = {
+    "warmingSwitch1": "warmingAutoClose",
+    "warmingSwitch2": "warmingAutoClose",
+    "ventilationSwitch": "ventilationAutoClose",
+}
+AUTO_CLOSE_MIN, AUTO_CLOSE_MAX = 1, 90
+
+def _intervals(steps):
+    """steps 为 [(开关字段元组, 分钟)]，依次执行；返回 {开关: [[开始分钟, 结束分钟]]}，相邻区间合并"""
+    intervals = {}
+    t = 0
+    for keys, minutes in steps:
+        for key in keys:
+            spans = intervals.setdefault(key, [])
+            if spans and spans[-1][1] == t:
+                spans[-1][1] = t + minutes
+            else:
+                spans.append([t, t + minutes])
+        t += minutes
+    return intervals
+
+def _merge(spans):
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def _add_linkage(state, intervals):
+    """按联动规则补齐依赖开关的区间：开取暖时设备会同时开启吹风，吹风需随取暖一同关闭
+
+    依赖开关并入所需的区间，结束时由本地定时器关闭，方案中间也不会先关吹风再连带关掉取暖；
+    方案开始时已开启且方案未涉及的依赖保持原样。
+    """
+    for (key, on), deps in LINKAGE_RULES.items():
+        if not on or key not in intervals:
+            continue
+        for dep, dep_on in deps:
+            if not dep_on or (dep not in intervals and state.is_on(dep)):
+                continue
+            intervals[dep] = _merge(intervals.get(dep, []) + [list(span) for span in intervals[key]])
+
+def compile_schedule(state, steps, now):
+    """编译定时方案
+
+    返回 (params, timers)：params 为一次合并下发的参数写入（已与当前状态相同的参数不写），
+    timers 为按时间排序的 [(延时秒数, 开关字段, 是否开启)]，延时为 0 的动作立即执行。
+    每个自动关闭参数只能取一个值，取能覆盖最多区间的时长；照明关闭时刻只覆盖第一段照明。
+    """
+    intervals = _intervals(steps)
+    _add_linkage(state, intervals)
+
+    def armed(key):
+        # 设备从开启时开始计时：方案开始时已开启的开关，即使区间稍后才开始，设备计时也早于区间，
+        # 不能交给自动关闭，改用本地定时器关闭
+        return not state.is_on(key)
+
+    durations = {}
+    for key, spans in intervals.items():
+        param = AUTO_CLOSE_PARAMS.get(key)
+        if param is None:
+            continue
+        for start, end in spans:
+            if armed(key) and AUTO_CLOSE_MIN <= end - start <= AUTO_CLOSE_MAX:
+                durations.setdefault(param, Counter())[end - start] += 1
+    chosen = {}
+    for param, counts in durations.items():
+        current = state.param(param)
+        chosen[param] = max(counts, key=lambda d: (counts[d], d == current))
+
+    light = None
+    spans = intervals.get("lightSwitch")
+    if spans and armed("lightSwitch"):
+        stop = now + timedelta(minutes=spans[0][1])
+        light = {"status": True, "stopHour": stop.hour, "stopMinute": stop.minute}
+
+    timers = []
+    for key, spans in intervals.items():
+        param = AUTO_CLOSE_PARAMS.get(key)
+        for i, (start, end) in enumerate(spans):
+            if start or armed(key):
+                # 开始时已开启的开关到点仍补发开启（已开启时为空操作），防止期间被关闭
+                timers.append((start * 60, key, True))
+            if key == "lightSwitch":
+                auto = i == 0 and light is not None
+            else:
+                auto = armed(key) and chosen.get(param) == end - start
+            if not auto:
+                timers.append((end * 60, key, False))
+    timers.sort(key=lambda timer: timer[0])
+
+    params = {param: value for param, value in chosen.items() if state.param(param) != value}
+    if light is not None and light != state.light_auto_close.as_dict():
+        params["lightAutoClose"] = light
+    return params, timers
+
+class ScheduleRunner:
+    """按设备执行已编译的定时方案；同一设备的新方案会取消旧方案未触发的定时器"""
+    def __init__(self, coordinator):
+        self.coordinator = coordinator
+        self._timers = {}  # mac -> {序号: 取消函数}，触发后移除
+        self._tasks = set()
+
+    def pending(self, mac):
+        return len(self._timers.get(mac, ()))
+
+    async def async_start(self, mac, steps):
+        """steps 规则同 compile_schedule；为空时只取消该设备的方案"""
+        self.cancel(mac)
+        if not steps:
+            return
+        # 在第一次让出事件循环前登记，期间到来的取消或新方案会替换/移除它，本方案随即停止
+        unsubs = self._timers[mac] = {}
+        coordinator = self.coordinator
+        await coordinator.async_ensure_fresh(mac)
+        state = coordinator.data.get(mac)
+        if state is None or self._timers.get(mac) is not unsubs:
+            return
+        params, timers = compile_schedule(state, steps, dt_util.now())
+        _LOGGER.debug(f"定时方案 ({mac}): 参数写入 {params}，定时器 {timers}")
+        if params:
+            changes = {}
+            for key, value in params.items():
+                if isinstance(value, dict):
+                    changes.update((f"{key}.{k}", v) for k, v in value.items())
+                else:
+                    changes[key] = value
+            payload = {"mac": mac, "setParamter": True, **params}
+            # 先写入自动关闭参数，再开启开关，保证设备计时生效
+            await coordinator.optimistic.async_run(mac, changes, lambda: coordinator.commands.submit(payload))
+        for i, (delay, key, on) in enumerate(timers):
+            if self._timers.get(mac) is not unsubs:
+                # 等待期间已被取消或被新方案替换，已设置的定时器由 cancel 撤销
+                return
+            if delay:
+                unsubs[i] = async_call_later(coordinator.hass, delay, partial(self._fire, mac, i, key, on))
+            else:
+                await self._async_switch(mac, key, on, refresh=False)
+
+    @callback
+    def _fire(self, mac, i, key, on, _now):
+        self._timers.get(mac, {}).pop(i, None)
+        task = self.coordinator.hass.async_create_task(self._async_switch(mac, key, on))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_switch(self, mac, key, on, refresh=True):
+        coordinator = self.coordinator
+        if refresh:
+            # 翻转语义需基于可信状态
+            await coordinator.async_ensure_fresh(mac)
+        state = coordinator.data.get(mac)
+        if state is None or state.is_on(key) == on:
+            return
+        wire, changes = plan_switch(state, key, on)
+        payload = {"mac": mac, **wire}
+        try:
+            await coordinator.optimistic.async_run(mac, changes, lambda: coordinator.commands.submit(payload))
+        except Exception as e:
+            _LOGGER.error(f"定时动作失败 ({mac} {key}): {e}")
+
+    @callback
+    def cancel(self, mac=None):
+        """取消指定设备（默认全部）未触发的定时器，在卸载集成时调用"""
+        for m in [mac] if mac is not None else list(self._timers):
+            unsubs = self._timers.pop(m, {})
+            for unsub in unsubs.values():
+                unsub()
+            unsubs.clear()
+        if mac is None:
+            for task in self._tasks:
+                task.cancel()
@@ -0,0 +1,44 @@
+import random
+import time
+from .const import (
+    FAST_POLL_INTERVAL, ACTIVE_WINDOW, IDLE_AFTER, IDLE_POLL_INTERVAL, MAX_BACKOFF_INTERVAL,
+)
+
+class AdaptivePollScheduler:
+    """根据设备活动与云端健康状况计算下一次轮询间隔（秒）"""
+    def __init__(self, base, fast=FAST_POLL_INTERVAL, idle=IDLE_POLL_INTERVAL, adaptive=True):
+        self.base, self.fast, self.idle = base, fast, idle
+        # 关闭自适应时固定按 base 轮询，只保留失败退避
+        self.adaptive = adaptive
+        self.failures = 0
+        # 启动时按常规间隔轮询，不视为活动状态
+        self.last_active = time.monotonic() - ACTIVE_WINDOW
+
+    def note_activity(self):
+        """用户发出指令后调用，进入快速轮询窗口"""
+        self.last_active = time.monotonic()
+
+    def on_command(self):
+        """指令发出后的轮询间隔"""
+        self.note_activity()
+        return self.fast if self.adaptive else self.base
+
+    def on_success(self, devices):
+        self.failures = 0
+        if not self.adaptive:
+            return self.base
+        now = time.monotonic()
+        if any(dev.active for dev in devices.values()):
+            self.last_active = now
+        idle_for = now - self.last_active
+        if idle_for < ACTIVE_WINDOW:
+            return self.fast
+        if idle_for < IDLE_AFTER:
+            return self.base
+        return max(self.base, self.idle)
+
+    def on_failure(self):
+        """指数退避，取一半固定延时加一半随机抖动，避免多实例同时重试"""
+        self.failures += 1
+        delay = min(MAX_BACKOFF_INTERVAL, self.base * 2 ** (self.failures - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
@@ -1,56 +1,56 @@
 from homeassistant.components.select import SelectEntity
-from .const import DOMAIN
+from .config_flow import get_option
+from .const import DOMAIN, CONF_MOTO_VERSION
+from .entity import ZinguoEntity, async_setup_device_entities
 
 async def async_setup_entry(hass, entry, async_add_entities):
     data = hass.data[DOMAIN][entry.entry_id]
     coordinator, api = data["coordinator"], data["api"]
-    entities = []
-    for mac in coordinator.data:
-        entities.append(ZinguoLinkSelect(coordinator, api, mac))
-        entities.append(ZinguoMotoSelect(coordinator, api, mac))
-    async_add_entities(entities)
+    async_setup_device_entities(coordinator, entry, async_add_entities, lambda mac: [
+        ZinguoLinkSelect(coordinator, api, mac),
+        ZinguoMotoSelect(coordinator, api, mac, entry),
+    ])
 
-class ZinguoLinkSelect(SelectEntity):
+class ZinguoLinkSelect(ZinguoEntity, SelectEntity):
     _attr_options = ["不联动", "联动取暖1", "联动取暖1和2"]
     _map = {"不联动": 0, "联动取暖1": 1, "联动取暖1和2": 3}
     _inv = {0: "不联动", 1: "联动取暖1", 3: "联动取暖1和2"}
+    _watch = ("comovement",)
 
     def __init__(self, coordinator, api, mac):
-        self.coordinator, self.api, self.mac = coordinator, api, mac
-        self._attr_name = f"浴霸 联动模式 ({mac[-4:]})"
-        self._attr_unique_id = f"zinguo_{mac}_linkage"
+        super().__init__(coordinator, mac, "linkage", "联动模式")
+        self.api = api
 
     @property
     def current_option(self):
-        val = self.coordinator.data.get(self.mac, {}).get("comovement", 0)
+        val = self.device.param("comovement", 0)
         return self._inv.get(val, "不联动")
 
     async def async_select_option(self, option):
-        await self.api.send_control({"mac": self.mac, "setParamter": True, "comovement": self._map[option]})
-        await self.coordinator.async_request_refresh()
+        val = self._map[option]
+        await self.coordinator.optimistic.async_run(
+            self.mac, {"comovement": val},
+            lambda: self.coordinator.commands.submit({"mac": self.mac, "setParamter": True, "comovement": val}),
+        )
 
-    @property
-    def device_info(self):
-        return {"identifiers": {(DOMAIN, self.mac)}, "name": "峥果浴霸"}
-
-class ZinguoMotoSelect(SelectEntity):
+class ZinguoMotoSelect(ZinguoEntity, SelectEntity):
     _attr_options = ["单电机", "双电机"]
+    _watch = ("motoVersion",)
 
-    def __init__(self, coordinator, api, mac):
-        self.coordinator, self.api, self.mac = coordinator, api, mac
-        self._attr_name = f"浴霸 电机模式 ({mac[-4:]})"
-        self._attr_unique_id = f"zinguo_{mac}_moto_ver"
+    def __init__(self, coordinator, api, mac, entry):
+        super().__init__(coordinator, mac, "moto_ver", "电机模式")
+        self.api = api
+        self.entry = entry
 
     @property
     def current_option(self):
-        val = self.coordinator.data.get(self.mac, {}).get("motoVersion")
+        # 设备未上报电机版本时使用配置中的电机版本
+        val = self.device.param("motoVersion", int(get_option(self.entry, CONF_MOTO_VERSION)))
         return "单电机" if val == 1 else "双电机"
 
     async def async_select_option(self, option):
         val = 1 if option == "单电机" else 2
-        await self.api.send_control({"mac": self.mac, "setParamter": True, "motoVersion": val})
-        await self.coordinator.async_request_refresh()
-
-    @property
-    def device_info(self):
-        return {"identifiers": {(DOMAIN, self.mac)}, "name": "峥果浴霸"}
\ No newline at end of file
+        await self.coordinator.optimistic.async_run(
+            self.mac, {"motoVersion": val},
+            lambda: self.coordinator.commands.submit({"mac": self.mac, "setParamter": True, "motoVersion": val}),
+        )
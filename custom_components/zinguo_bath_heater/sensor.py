@@ -1,22 +1,150 @@
-from homeassistant.components.sensor import SensorEntity, SensorDeviceClass
+from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
+from homeassistant.core import callback
+from homeassistant.const import EntityCategory, PERCENTAGE, UnitOfTime
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .circuit import STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
 from .const import DOMAIN
+from .entity import ZinguoEntity, account_device_info, async_setup_device_entities
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000)
+
+# 可选的埋点诊断传感器（默认禁用）：(键, 名称, 单位, 取值函数)
+METRIC_SENSORS = (
+    ("poll_latency", "轮询平均延迟", UnitOfTime.MILLISECONDS, lambda m: _ms(m.mean_latency("get_devices"))),
+    ("command_latency", "指令平均延迟", UnitOfTime.MILLISECONDS, lambda m: _ms(m.mean_latency("send_control"))),
+    ("convergence_time", "状态确认平均耗时", UnitOfTime.MILLISECONDS, lambda m: _ms(m.convergence.mean)),
+    ("error_rate", "请求错误率", PERCENTAGE, lambda m: None if m.error_rate is None else round(m.error_rate * 100, 1)),
+)
+
+def _round(value, digits=1):
+    return None if value is None else round(value, digits)
+
+def _minutes_to_target(history, device):
+    # 目标为过温自动关闭温度，升温到此温度时设备会停止取暖
+    seconds = history.time_to(device.param("overHeatAutoClose"))
+    return None if seconds is None else round(seconds / 60, 1)
+
+# 由温度历史增量计算的派生传感器：(键, 名称, 单位, 设备类别, 取值函数)
+TEMP_STATS = (
+    ("temp_rate", "温度变化率", "°C/min", None,
+     lambda h, d: None if h.slope is None else round(h.slope * 60, 2)),
+    ("temp_time_to_target", "升温至过温关闭预计时间", UnitOfTime.MINUTES, SensorDeviceClass.DURATION, _minutes_to_target),
+    ("temp_min", "温度最低值", "°C", SensorDeviceClass.TEMPERATURE, lambda h, d: _round(h.min)),
+    ("temp_max", "温度最高值", "°C", SensorDeviceClass.TEMPERATURE, lambda h, d: _round(h.max)),
+    ("temp_mean", "温度平均值", "°C", SensorDeviceClass.TEMPERATURE, lambda h, d: _round(h.mean)),
+)
 
 async def async_setup_entry(hass, entry, async_add_entities):
     coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-    async_add_entities([ZinguoTemp(coordinator, mac) for mac in coordinator.data])
+    entities = [ZinguoCloudCircuitSensor(coordinator, entry)]
+    entities.extend(ZinguoMetricSensor(coordinator, entry, *desc) for desc in METRIC_SENSORS)
+    async_add_entities(entities)
+    async_setup_device_entities(coordinator, entry, async_add_entities, lambda mac: [
+        ZinguoTemp(coordinator, mac),
+        *(ZinguoTempStat(coordinator, mac, *desc) for desc in TEMP_STATS),
+    ])
+
+class ZinguoTemp(ZinguoEntity, SensorEntity):
+    _watch = ("temperature",)
 
-class ZinguoTemp(SensorEntity):
     def __init__(self, coordinator, mac):
-        self.coordinator, self.mac = coordinator, mac
+        super().__init__(coordinator, mac, "temp", "温度")
         self._attr_name = f"浴霸温度 ({mac[-4:]})"
         self._attr_device_class = SensorDeviceClass.TEMPERATURE
         self._attr_native_unit_of_measurement = "°C"
-        self._attr_unique_id = f"zinguo_{mac}_temp"
 
     @property
     def native_value(self):
-        return self.coordinator.data.get(self.mac, {}).get("temperature")
+        return self.device.temperature
+
+class ZinguoTempStat(ZinguoEntity, SensorEntity):
+    """温度历史派生的统计传感器，每写入一个新样本更新一次"""
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, coordinator, mac, key, name, unit, device_class, value_fn):
+        super().__init__(coordinator, mac, key, name)
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._value_fn = value_fn
+        self._seq = None
+
+    @property
+    def history(self):
+        return self.coordinator.history.get(self.mac)
+
+    @property
+    def available(self):
+        return super().available and self.history is not None
+
+    @property
+    def native_value(self):
+        history = self.history
+        return None if history is None else self._value_fn(history, self.device)
+
+    @callback
+    def _handle_coordinator_update(self):
+        # 温度不变时变化率等统计量仍会变化，按样本序号而非字段差异判断
+        history = self.history
+        seq = history.seq if history else None
+        if seq != self._seq or self.coordinator.changes is None:
+            self._seq = seq
+            self.coordinator.state_writes += 1
+            self.async_write_ha_state()
+        else:
+            self.coordinator.skipped_writes += 1
+
+class ZinguoCloudCircuitSensor(CoordinatorEntity, SensorEntity):
+    """云端熔断器状态（诊断），每个账号一个"""
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_options = [STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN]
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_translation_key = "cloud_circuit"
+    _attr_icon = "mdi:cloud-alert"
+
+    def __init__(self, coordinator, entry):
+        super().__init__(coordinator)
+        self.api = coordinator.api
+        self._attr_name = f"峥果云端连接状态 ({entry.title})"
+        self._attr_unique_id = f"zinguo_{entry.entry_id}_cloud_circuit"
+        self._attr_device_info = account_device_info(entry)
+
+    @property
+    def available(self):
+        # 云端故障时也要显示熔断状态
+        return True
+
+    @property
+    def native_value(self):
+        return self.api.breaker.state
 
     @property
-    def device_info(self):
-        return {"identifiers": {(DOMAIN, self.mac)}, "name": "峥果浴霸"}
\ No newline at end of file
+    def extra_state_attributes(self):
+        return {
+            "consecutive_failures": self.api.breaker.failures,
+            "rate_limit_tokens": round(self.api.limiter.tokens, 1),
+            "rate_limited_requests": self.api.limiter.throttled,
+        }
+
+class ZinguoMetricSensor(CoordinatorEntity, SensorEntity):
+    """埋点统计诊断传感器，随每次轮询更新"""
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:chart-timeline-variant"
+
+    def __init__(self, coordinator, entry, key, name, unit, value_fn):
+        super().__init__(coordinator)
+        self.metrics = coordinator.api.metrics
+        self._value_fn = value_fn
+        self._attr_name = f"峥果{name} ({entry.title})"
+        self._attr_unique_id = f"zinguo_{entry.entry_id}_{key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_info = account_device_info(entry)
+
+    @property
+    def available(self):
+        return True
+
+    @property
+    def native_value(self):
+        return self._value_fn(self.metrics)
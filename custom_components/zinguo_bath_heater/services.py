@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from functools import partial
+import voluptuous as vol
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from .const import DOMAIN, APPLY_STATE_CONCURRENCY
+from .optimistic import plan_state
+from .schedule import SCHEDULE_ACTIONS
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_RUN_SCHEDULE = "run_schedule"
+SERVICE_APPLY_STATE = "apply_state"
+
+STEP_SCHEMA = vol.Schema({
+    vol.Required("action"): vol.All(cv.ensure_list, [vol.In(SCHEDULE_ACTIONS)]),
+    vol.Required("duration"): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+})
+
+RUN_SCHEDULE_SCHEMA = vol.Schema({
+    vol.Required("mac"): cv.string,
+    vol.Optional("steps", default=[]): vol.All(cv.ensure_list, [STEP_SCHEMA]),
+})
+
+# 开关名与 run_schedule 的动作名一致，未指定的开关保持不变；不填 mac 时作用于所有设备
+APPLY_STATE_SCHEMA = vol.Schema({
+    vol.Optional("mac"): vol.All(cv.ensure_list, [cv.string]),
+    **{vol.Optional(action): cv.boolean for action in SCHEDULE_ACTIONS},
+})
+
+def _coordinators(hass):
+    return [data["coordinator"] for data in hass.data.get(DOMAIN, {}).values()]
+
+def _coordinator_for(hass, mac):
+    """在所有账号中查找管理该设备的协调器"""
+    for coordinator in _coordinators(hass):
+        if coordinator.data and mac in coordinator.data:
+            return coordinator
+    raise HomeAssistantError(f"未找到峥果浴霸设备: {mac}")
+
+async def _async_run_schedule(hass, call):
+    mac = call.data["mac"]
+    coordinator = _coordinator_for(hass, mac)
+    steps = [
+        (tuple(SCHEDULE_ACTIONS[action] for action in step["action"]), step["duration"])
+        for step in call.data["steps"]
+    ]
+    await coordinator.schedules.async_start(mac, steps)
+
+async def _async_apply_state(hass, call):
+    """按缓存状态为每台设备计算最少的开关指令，有限并发下发
+
+    每个账号只在缓存过期时刷新一次；指令的确认由各账号的确认调度合并为一次轮询。
+    """
+    targets = {SCHEDULE_ACTIONS[action]: call.data[action] for action in SCHEDULE_ACTIONS if action in call.data}
+    if not targets:
+        return
+    if "mac" in call.data:
+        groups = {}
+        for mac in call.data["mac"]:
+            groups.setdefault(_coordinator_for(hass, mac), []).append(mac)
+    else:
+        groups = {c: list(c.data or {}) for c in _coordinators(hass)}
+
+    plans = []
+    for coordinator, macs in groups.items():
+        # 同一账号一次拉取即可刷新全部设备
+        stale = next((mac for mac in macs if not coordinator.is_fresh(mac)), None)
+        if stale is not None:
+            await coordinator.async_ensure_fresh(stale)
+        for mac in macs:
+            state = coordinator.data.get(mac)
+            if state is None:
+                continue
+            try:
+                wire, changes = plan_state(state, targets)
+            except ValueError as err:
+                raise HomeAssistantError(str(err)) from err
+            if wire:
+                plans.append((coordinator, mac, {"mac": mac, **wire}, changes))
+
+    semaphore = asyncio.Semaphore(APPLY_STATE_CONCURRENCY)
+
+    async def run(coordinator, mac, payload, changes):
+        async with semaphore:
+            await coordinator.optimistic.async_run(mac, changes, lambda: coordinator.commands.submit(payload))
+
+    results = await asyncio.gather(*(run(*plan) for plan in plans), return_exceptions=True)
+    failed = []
+    for (_, mac, _, _), result in zip(plans, results):
+        if isinstance(result, Exception):
+            _LOGGER.error(f"设置状态失败 ({mac}): {result}")
+            failed.append(mac)
+    _LOGGER.debug(f"批量设置状态: {len(plans)} 台设备需要下发指令，失败 {len(failed)} 台")
+    if failed:
+        raise HomeAssistantError(f"部分设备设置失败: {failed}")
+
+def async_setup_services(hass):
+    """注册集成服务（多个账号共用一份）；旧版 HA 的 ServiceCall 没有 hass 属性，处理函数预先绑定 hass"""
+    if hass.services.has_service(DOMAIN, SERVICE_RUN_SCHEDULE):
+        return
+    hass.services.async_register(
+        DOMAIN, SERVICE_RUN_SCHEDULE, partial(_async_run_schedule, hass), schema=RUN_SCHEDULE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_APPLY_STATE, partial(_async_apply_state, hass), schema=APPLY_STATE_SCHEMA
+    )
+
+def async_unload_services(hass):
+    """最后一个账号卸载时移除服务"""
+    if hass.data.get(DOMAIN):
+        return
+    hass.services.async_remove(DOMAIN, SERVICE_RUN_SCHEDULE)
+    hass.services.async_remove(DOMAIN, SERVICE_APPLY_STATE)
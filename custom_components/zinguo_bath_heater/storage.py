@@ -0,0 +1,45 @@
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from .const import DOMAIN, STORAGE_VERSION, STORAGE_SAVE_DELAY
+
+class ZinguoStore:
+    """按配置条目持久化的运行时数据（登录令牌、最近一次成功轮询的设备快照）"""
+    def __init__(self, hass, entry_id):
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+        self.data = {}
+        self._devices = None
+
+    async def async_load(self):
+        self.data = await self._store.async_load() or {}
+        return self.data
+
+    @property
+    def token(self):
+        return self.data.get("token")
+
+    @property
+    def devices(self):
+        """上次保存的设备快照，接口格式的 dict 列表"""
+        return self.data.get("devices") or []
+
+    def _data_to_save(self):
+        # 快照在真正写盘时才序列化，延迟期间的多次轮询只保留最新一次
+        if self._devices is not None:
+            self.data["devices"] = [state.as_dict() for state in self._devices.values()]
+        return self.data
+
+    @callback
+    def async_set_token(self, token):
+        """令牌刷新后延迟写盘，合并短时间内的多次更新"""
+        self.data["token"] = token
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def async_set_devices(self, devices, save=True):
+        """devices 为 {mac: DeviceState}；save 为 False 时只更新待写入的数据，不安排写盘"""
+        self._devices = devices
+        if save:
+            self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    async def async_remove(self):
+        await self._store.async_remove()
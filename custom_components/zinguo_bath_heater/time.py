@@ -1,6 +1,7 @@
 from homeassistant.components.time import TimeEntity
 from datetime import time
 from .const import DOMAIN
+from .entity import ZinguoEntity, async_setup_device_entities
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """设置时间平台"""
@@ -8,31 +9,26 @@ async def async_setup_entry(hass, entry, async_add_entities):
     coordinator = data["coordinator"]
     api = data["api"]
     
-    entities = []
-    for mac in coordinator.data:
-        entities.append(ZinguoLightAutoCloseTime(coordinator, api, mac))
-    
-    async_add_entities(entities)
+    async_setup_device_entities(
+        coordinator, entry, async_add_entities, lambda mac: [ZinguoLightAutoCloseTime(coordinator, api, mac)]
+    )
 
-class ZinguoLightAutoCloseTime(TimeEntity):
+class ZinguoLightAutoCloseTime(ZinguoEntity, TimeEntity):
     """照明小时与分钟合并后的时间选择实体"""
+    _watch = ("lightAutoClose.stopHour", "lightAutoClose.stopMinute")
     
     def __init__(self, coordinator, api, mac):
-        self.coordinator = coordinator
+        super().__init__(coordinator, mac, "light_time_combined", "照明自动关闭时间")
         self.api = api
-        self.mac = mac
-        self._attr_name = f"浴霸 照明自动关闭时间 ({mac[-4:]})"
-        self._attr_unique_id = f"zinguo_{mac}_light_time_combined"
         self._attr_icon = "mdi:timer-cog"
 
     @property
     def native_value(self) -> time:
         """从 API 数据返回当前的 HH:MM"""
-        device = self.coordinator.data.get(self.mac, {})
         # 获取嵌套字段 stopHour 和 stopMinute
-        config = device.get("lightAutoClose", {})
-        hr = config.get("stopHour", 0)
-        mn = config.get("stopMinute", 0)
+        config = self.device.light_auto_close
+        hr = config.stop_hour or 0
+        mn = config.stop_minute or 0
         # 确保数值合法
         return time(hour=max(0, min(23, hr)), minute=max(0, min(59, mn)))
 
@@ -47,15 +43,8 @@ class ZinguoLightAutoCloseTime(TimeEntity):
                 "stopMinute": value.minute
             }
         }
-        await self.api.send_control(payload)
-        # 发送后立即刷新本地状态
-        await self.coordinator.async_request_refresh()
-
-    @property
-    def device_info(self):
-        """关联到同一台浴霸设备"""
-        return {
-            "identifiers": {(DOMAIN, self.mac)},
-            "name": "峥果浴霸",
-            "manufacturer": "Zinguo"
-        }
\ No newline at end of file
+        changes = {f"lightAutoClose.{k}": v for k, v in payload["lightAutoClose"].items()}
+        # 界面立即显示新时间，由确认刷新与云端对齐
+        await self.coordinator.optimistic.async_run(
+            self.mac, changes, lambda: self.coordinator.commands.submit(payload)
+        )
@@ -0,0 +1,117 @@
+import asyncio
+import aiohttp
+import logging
+import time
+from .decode import ZinguoMalformedError, ZinguoServerError, decode_response
+from .ratelimit import PRIORITY_POLL
+from .const import (
+    DEVICES_PATH, CONTROL_PATH, PROTECTION_PATH,
+    LOCAL_STATUS_PATH, LOCAL_CONTROL_PATH, LOCAL_PROTECTION_PATH, LOCAL_TIMEOUT,
+    HEALTH_ALPHA, HEALTH_THRESHOLD, TRANSPORT_RETRY_AFTER,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+class ZinguoTransport:
+    """传输通道基类，维护健康评分（0~1 的指数加权成功率）"""
+    name = ""
+
+    def __init__(self, api):
+        self.api = api
+        self.health = 1.0
+        self.last_failure = None
+
+    @property
+    def available(self):
+        """健康评分低于阈值时降级，冷却时间过后允许再次探测"""
+        if self.health >= HEALTH_THRESHOLD or self.last_failure is None:
+            return True
+        return time.monotonic() - self.last_failure >= TRANSPORT_RETRY_AFTER
+
+    def record_success(self):
+        self.health += HEALTH_ALPHA * (1 - self.health)
+
+    def record_failure(self):
+        self.health -= HEALTH_ALPHA * self.health
+        self.last_failure = time.monotonic()
+
+    async def get_devices(self):
+        raise NotImplementedError
+
+    async def send_control(self, data):
+        raise NotImplementedError
+
+    async def set_protection(self, mac, black_setting):
+        raise NotImplementedError
+
+class CloudTransport(ZinguoTransport):
+    """峥果云端接口 (iot.zinguo.com)"""
+    name = "cloud"
+
+    async def get_devices(self):
+        url = f"{self.api.base_url}{DEVICES_PATH}?tt={int(time.time()*1000)}"
+        data = await self.api._request("GET", url, priority=PRIORITY_POLL)
+        if isinstance(data, list):
+            return data
+        # 正常时返回设备列表，错误时为带错误码的对象
+        code = data.get("code") if isinstance(data, dict) else None
+        if isinstance(code, int) and code >= 500:
+            raise ZinguoServerError(f"设备列表返回错误: {data}")
+        raise ZinguoMalformedError(f"设备列表格式异常: {str(data)[:200]}")
+
+    async def send_control(self, data):
+        return await self.api._request("PUT", self.api.base_url + CONTROL_PATH, data)
+
+    async def set_protection(self, mac, black_setting):
+        payload = {"mac": mac, "blackSetting": black_setting}
+        return await self.api._request("POST", self.api.base_url + PROTECTION_PATH, payload)
+
+class LocalTransport(ZinguoTransport):
+    """局域网直连通道
+
+    每个地址对应一台浴霸（或局域网桥接），提供与云端相同结构的 JSON：
+    GET 状态返回单台设备数据，PUT 控制与 POST 温控保护的请求体与云端一致。
+    读取状态时记录 MAC 与地址的对应关系，用于之后的指令路由。
+    """
+    name = "local"
+
+    def __init__(self, api, hosts):
+        super().__init__(api)
+        self.hosts = hosts
+        self.mac_hosts = {}
+        self.timeout = LOCAL_TIMEOUT
+
+    def has(self, mac):
+        return mac in self.mac_hosts
+
+    async def _call(self, method, host, path, payload=None):
+        url = f"http://{host}{path}"
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with self.api.session.request(method, url, json=payload, timeout=timeout) as resp:
+            body = await resp.read()
+            data = decode_response(resp.status, resp.content_type, body)
+            resp.raise_for_status()
+            return data
+
+    async def get_devices(self):
+        results = await asyncio.gather(
+            *(self._call("GET", host, LOCAL_STATUS_PATH) for host in self.hosts),
+            return_exceptions=True,
+        )
+        devices = []
+        for host, dev in zip(self.hosts, results):
+            if isinstance(dev, dict) and "mac" in dev:
+                self.mac_hosts[dev["mac"]] = host
+                devices.append(dev)
+            else:
+                _LOGGER.debug(f"局域网设备 {host} 无响应: {dev}")
+        if not devices:
+            raise ConnectionError("局域网内没有可用的浴霸")
+        return devices
+
+    async def send_control(self, data):
+        return await self._call("PUT", self.mac_hosts[data["mac"]], LOCAL_CONTROL_PATH, data)
+
+    async def set_protection(self, mac, black_setting):
+        payload = {"mac": mac, "blackSetting": black_setting}
+        return await self._call("POST", self.mac_hosts[mac], LOCAL_PROTECTION_PATH, payload)
@@ -0,0 +1,112 @@
+"""离线测试：指令队列顺序、开关规划与定时方案编译、并发请求遇令牌失效时只重新登录一次
+
+以 tools/fake_cloud.py 模拟云端，无需网络与真实设备（需安装 homeassistant）：
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from fake_cloud import FakeCloud, start_server
+from fake_device import SimulatedHeater
+from custom_components.zinguo_bath_heater.api import ZinguoAPI
+from custom_components.zinguo_bath_heater.command_queue import ZinguoCommandQueue
+from custom_components.zinguo_bath_heater.model import DeviceState
+from custom_components.zinguo_bath_heater.optimistic import CMD_FORCE_OFF, CMD_TOGGLE, plan_state
+from custom_components.zinguo_bath_heater.ratelimit import TokenBucket
+from custom_components.zinguo_bath_heater.schedule import compile_schedule
+
+MAC = "AABBCCDDEEFF"
+
+def _state(**switches):
+    heater = SimulatedHeater(MAC)
+    heater.apply_control({key: CMD_TOGGLE for key, on in switches.items() if on})
+    return DeviceState.from_dict(heater.state)
+
+class RecordingAPI:
+    """按到达顺序记录下发的指令"""
+    def __init__(self):
+        self.sent = []
+
+    async def send_control(self, payload):
+        await asyncio.sleep(0.01)
+        self.sent.append(payload)
+        return {}
+
+def test_command_queue_keeps_order():
+    async def run():
+        api = RecordingAPI()
+        queue = ZinguoCommandQueue(api, 0.05)
+        tasks = []
+        for payload in (
+            {"mac": MAC, "setParamter": True, "warmingAutoClose": 20},
+            {"mac": MAC, "lightSwitch": 1},
+            {"mac": MAC, "windSwitch": 1},
+            {"mac": MAC, "setParamter": True, "ventilationAutoClose": 30},
+        ):
+            tasks.append(asyncio.create_task(queue.submit(payload)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        queue.close()
+        return api.sent
+
+    sent = asyncio.run(run())
+    # 排在开关之前的参数写入先行下发，开关之后的参数写入不会越过开关
+    assert [next(k for k in p if k not in ("mac", "setParamter")) for p in sent] == [
+        "warmingAutoClose", "lightSwitch", "windSwitch", "ventilationAutoClose",
+    ]
+
+def test_plan_state():
+    state = _state(lightSwitch=True, windSwitch=True, warmingSwitch1=True)
+    assert plan_state(state, {"lightSwitch": False}) == ({"lightSwitch": CMD_TOGGLE}, {"lightSwitch": False})
+    # 关吹风联动关闭取暖：吹风翻转，取暖强制关闭
+    wire, changes = plan_state(state, {"windSwitch": False})
+    assert wire == {"windSwitch": CMD_TOGGLE, "warmingSwitch1": CMD_FORCE_OFF, "warmingSwitch2": CMD_FORCE_OFF}
+    assert changes == {"windSwitch": False, "warmingSwitch1": False}
+    assert plan_state(state, {"windSwitch": False, "lightSwitch": False})[0] == {"turnOffAll": 1}
+    assert plan_state(state, {"lightSwitch": True}) == ({}, {})
+
+def test_compile_schedule_adds_linkage():
+    # 取暖20分钟后换气30分钟：取暖由设备自动关闭，联动开启的吹风随取暖结束关闭
+    params, timers = compile_schedule(
+        _state(), [(("warmingSwitch1",), 20), (("ventilationSwitch",), 30)], datetime(2024, 1, 1, 12, 0),
+    )
+    assert params["warmingAutoClose"] == 20
+    assert (0, "warmingSwitch1", True) in timers
+    assert (0, "windSwitch", True) in timers
+    assert (1200, "windSwitch", False) in timers
+    assert (1200, "warmingSwitch1", False) not in timers
+
+def test_compile_schedule_already_on_uses_local_timer():
+    # 换气在方案开始时已开启，设备计时早于区间开始，关闭不能交给自动关闭参数
+    params, timers = compile_schedule(
+        _state(ventilationSwitch=True), [(("lightSwitch",), 10), (("ventilationSwitch",), 30)],
+        datetime(2024, 1, 1, 12, 0),
+    )
+    assert "ventilationAutoClose" not in params
+    assert (600, "ventilationSwitch", True) in timers
+    assert (2400, "ventilationSwitch", False) in timers
+
+def test_relogin_is_single_flight():
+    async def run():
+        cloud = FakeCloud(3, seed=0)
+        runner, base_url = await start_server(cloud)
+        api = ZinguoAPI("test", "test", limiter=TokenBucket(rate=1e9, capacity=1e9, reserve=0), base_url=base_url)
+        try:
+            await api.get_devices()
+            cloud.expire_tokens()
+            cloud.reset_counters()
+            results = await asyncio.gather(*(api.get_devices() for _ in range(5)))
+            return cloud.counters, results
+        finally:
+            await api.close()
+            await runner.cleanup()
+
+    counters, results = asyncio.run(run())
+    assert counters["login"] == 1
+    assert all(len(devices) == 3 for devices in results)
@@ -0,0 +1,132 @@
+"""离线基准测试：以 fake_cloud 模拟云端，测量 api.py / coordinator.py 热路径
+
+测量项（设备数 1 / 10 / 100 / 1000）：
+    - 轮询吞吐：每秒 get_devices 次数与单次轮询解析 DeviceState 的耗时
+    - 指令延时：经指令队列下发开关指令的平均值 / p95（含 api.metrics 埋点开销）
+    - 每次用户操作的请求数：一次开关、一次同时修改 5 个参数的场景
+    - 每台设备的内存：原始 dict 与 DeviceState 对比
+
+用法（需安装 homeassistant，集成包的 __init__ 依赖它）：
+    python tools/benchmark.py --devices 1 10 100 1000 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_cloud import FakeCloud, start_server
+from custom_components.zinguo_bath_heater.api import ZinguoAPI
+from custom_components.zinguo_bath_heater.command_queue import ZinguoCommandQueue
+from custom_components.zinguo_bath_heater.model import DeviceState
+from custom_components.zinguo_bath_heater.ratelimit import TokenBucket
+
+# 同时修改的 5 个参数，模拟一次"场景"操作
+SCENE = {
+    "ventilationAutoClose": 20,
+    "warmingAutoClose": 25,
+    "overHeatAutoClose": 38,
+    "temperatureCalibration": 1,
+    "comovement": 1,
+}
+
+def _unlimited():
+    # 基准测试只测客户端与协议开销，不受限流影响
+    return TokenBucket(rate=1e9, capacity=1e9, reserve=0)
+
+async def bench_poll(api, polls):
+    start = time.perf_counter()
+    for _ in range(polls):
+        devices = await api.get_devices()
+    elapsed = time.perf_counter() - start
+    parse_start = time.perf_counter()
+    for _ in range(polls):
+        {dev["mac"]: DeviceState.from_dict(dev) for dev in devices if isinstance(dev, dict) and "mac" in dev}
+    parse = (time.perf_counter() - parse_start) / polls
+    return {"polls_per_s": polls / elapsed, "parse_ms": parse * 1000}, devices
+
+async def bench_commands(api, cloud, macs, commands):
+    queue = ZinguoCommandQueue(api)
+    mac = macs[0]
+    # 分桶直方图精度不足，这里逐条记录耗时
+    samples = []
+    for _ in range(commands):
+        start = time.perf_counter()
+        await queue.submit({"mac": mac, "lightSwitch": 1})
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+
+    # 开关：一次操作一条请求
+    cloud.reset_counters()
+    await queue.submit({"mac": mac, "lightSwitch": 1})
+    toggle = cloud.counters["control"]
+
+    # 场景：5 个参数在合并窗口内提交，由队列合并
+    cloud.reset_counters()
+    await asyncio.gather(*(
+        queue.submit({"mac": mac, "setParamter": True, key: value}) for key, value in SCENE.items()
+    ))
+    scene = cloud.counters["control"]
+    queue.close()
+    return {
+        "cmd_mean_ms": sum(samples) / len(samples) * 1000,
+        "cmd_p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        "req_toggle": toggle,
+        "req_scene": scene,
+    }
+
+def bench_memory(devices):
+    # 以 JSON 往返生成与轮询结果等价、互不共享的原始数据
+    payload = json.dumps(devices)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    raw = json.loads(payload)
+    raw_bytes = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    before = tracemalloc.take_snapshot()
+    states = {dev["mac"]: DeviceState.from_dict(dev) for dev in raw}
+    state_bytes = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    tracemalloc.stop()
+    del states
+    return {"raw_b_per_dev": raw_bytes / len(devices), "state_b_per_dev": state_bytes / len(devices)}
+
+async def run(count, args):
+    cloud = FakeCloud(count, args.latency, args.jitter, args.error_rate, seed=0)
+    runner, base_url = await start_server(cloud)
+    api = ZinguoAPI("bench", "bench", limiter=_unlimited(), base_url=base_url)
+    try:
+        result = {"devices": count}
+        poll, devices = await bench_poll(api, args.polls)
+        result.update(poll)
+        result.update(await bench_commands(api, cloud, list(cloud.heaters), args.commands))
+        result.update(bench_memory(devices))
+        return result
+    finally:
+        await api.close()
+        await runner.cleanup()
+
+async def main_async(args):
+    columns = ("devices", "polls_per_s", "parse_ms", "cmd_mean_ms", "cmd_p95_ms",
+               "req_toggle", "req_scene", "raw_b_per_dev", "state_b_per_dev")
+    print(" ".join(f"{c:>15}" for c in columns))
+    for count in args.devices:
+        result = await run(count, args)
+        print(" ".join(
+            f"{result[c]:>15.2f}" if isinstance(result[c], float) else f"{result[c]:>15}" for c in columns
+        ))
+
+def main():
+    parser = argparse.ArgumentParser(description="峥果浴霸集成离线基准测试")
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--polls", type=int, default=20, help="每组轮询次数")
+    parser.add_argument("--commands", type=int, default=20, help="每组指令次数")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟云端延时（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""峥果云端模拟服务器：离线测试与基准测试用
+
+模拟登录、设备列表、开关控制与温控保护四个接口，可配置延时、抖动、
+错误注入、令牌有效期与模拟浴霸数量；各接口的请求次数记录在 counters 中。
+
+用法：
+    python tools/fake_cloud.py --port 8081 --devices 10 --latency 0.05 --error-rate 0.01
+然后以 ZinguoAPI(..., base_url="http://127.0.0.1:8081/api/v1") 连接。
+"""
+import argparse
+import asyncio
+import json
+import random
+import secrets
+import time
+from collections import Counter
+from aiohttp import web
+
+from fake_device import SimulatedHeater
+
+API_PREFIX = "/api/v1"
+
+class FakeCloud:
+    """云端状态：账号下的模拟浴霸、已签发令牌与请求计数"""
+    def __init__(self, devices=1, latency=0.0, jitter=0.0, error_rate=0.0, token_ttl=3600, seed=None):
+        self.rng = random.Random(seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self.heaters = {}
+        for i in range(devices):
+            heater = SimulatedHeater(f"{i:012X}")
+            self.heaters[heater.state["mac"]] = heater
+        self.tokens = {}  # token -> 过期时间
+        self.counters = Counter()
+
+    def reset_counters(self):
+        self.counters.clear()
+
+    def expire_tokens(self):
+        """立即让全部令牌失效，用于测试重新登录"""
+        self.tokens.clear()
+
+    async def delay(self):
+        seconds = self.latency + (self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0)
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def _fault(self):
+        return self.error_rate and self.rng.random() < self.error_rate
+
+    def _authorized(self, request):
+        expires = self.tokens.get(request.headers.get("x-access-token"))
+        return expires is not None and expires > time.monotonic()
+
+    def _wrap(self, endpoint, handler, auth=True):
+        async def route(request):
+            self.counters[endpoint] += 1
+            await self.delay()
+            if self._fault():
+                self.counters[f"{endpoint}_error"] += 1
+                return web.json_response({"code": 500, "msg": "internal error"}, status=500)
+            if auth and not self._authorized(request):
+                self.counters[f"{endpoint}_unauthorized"] += 1
+                return web.json_response({"code": 401, "msg": "token expired"}, status=401)
+            return await handler(request)
+        return route
+
+    async def login(self, request):
+        body = json.loads(await request.text())
+        if not body.get("account") or not body.get("password"):
+            return web.json_response({"code": 400, "msg": "account or password missing"})
+        token = secrets.token_hex(16)
+        self.tokens[token] = time.monotonic() + self.token_ttl
+        return web.json_response({"code": 200, "token": token})
+
+    async def devices(self, request):
+        for heater in self.heaters.values():
+            heater.tick()
+        return web.json_response([heater.state for heater in self.heaters.values()])
+
+    async def control(self, request):
+        body = json.loads(await request.text())
+        heater = self.heaters.get(body.get("mac"))
+        if heater is None:
+            return web.json_response({"code": 404, "msg": "device not found"})
+        heater.apply_control(body)
+        return web.json_response({"code": 200, "msg": "ok"})
+
+    async def protection(self, request):
+        body = json.loads(await request.text())
+        heater = self.heaters.get(body.get("mac"))
+        if heater is None:
+            return web.json_response({"code": 404, "msg": "device not found"})
+        heater.set_protection(body.get("blackSetting", {}))
+        return web.json_response({"code": 200, "msg": "ok"})
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_post(f"{API_PREFIX}/customer/login", self._wrap("login", self.login, auth=False))
+        app.router.add_get(f"{API_PREFIX}/customer/devices", self._wrap("devices", self.devices))
+        app.router.add_put(f"{API_PREFIX}/wifiyuba/yuBaControl", self._wrap("control", self.control))
+        app.router.add_post(f"{API_PREFIX}/wifiyuba/temperatureProtection", self._wrap("protection", self.protection))
+        return app
+
+async def start_server(cloud, host="127.0.0.1", port=0):
+    """在当前事件循环中启动服务器，返回 (runner, base_url)；port 为 0 时随机分配"""
+    runner = web.AppRunner(cloud.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}{API_PREFIX}"
+
+def main():
+    parser = argparse.ArgumentParser(description="峥果云端模拟服务器")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--devices", type=int, default=1, help="模拟浴霸数量")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的模拟延时（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延时抖动范围（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 错误的概率")
+    parser.add_argument("--token-ttl", type=float, default=3600, help="令牌有效期（秒）")
+    args = parser.parse_args()
+    cloud = FakeCloud(args.devices, args.latency, args.jitter, args.error_rate, args.token_ttl)
+    web.run_app(cloud.create_app(), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""局域网浴霸模拟器：无需真实硬件即可测试局域网直连通道
+
+用法：
+    python tools/fake_device.py --port 8080 --mac AABBCCDDEEFF
+然后在集成配置的局域网地址中填写 127.0.0.1:8080。
+"""
+import argparse
+import asyncio
+import json
+import random
+from aiohttp import web
+
+SWITCH_KEYS = ("lightSwitch", "windSwitch", "ventilationSwitch", "warmingSwitch1", "warmingSwitch2")
+WARMING_KEYS = ("warmingSwitch1", "warmingSwitch2")
+# 指令中不属于设备参数的字段
+CONTROL_META = {"mac", "masterUser", "setParamter", "action", "turnOffAll", *SWITCH_KEYS}
+
+class SimulatedHeater:
+    """按峥果协议语义模拟一台浴霸：开关 1 为翻转、2 为强制关闭，状态 1 为开、2 为关"""
+    def __init__(self, mac):
+        self.state = {
+            "mac": mac,
+            "name": f"浴霸 {mac[-4:]}",
+            "temperature": round(random.uniform(18, 24), 1),
+            **{key: 2 for key in SWITCH_KEYS},
+            "ventilationAutoClose": 30,
+            "warmingAutoClose": 30,
+            "overHeatAutoClose": 40,
+            "temperatureCalibration": 0,
+            "comovement": 0,
+            "motoVersion": 2,
+            "blackSetting": {"status": False, "openTime": 5, "pauseTime": 5},
+            "lightAutoClose": {"status": False, "stopHour": 0, "stopMinute": 0},
+        }
+
+    def apply_control(self, payload):
+        state = self.state
+        if payload.get("setParamter"):
+            for key, value in payload.items():
+                if key not in CONTROL_META:
+                    state[key] = value
+            return
+        if payload.get("turnOffAll") == 1:
+            for key in SWITCH_KEYS:
+                state[key] = 2
+            return
+        before = dict(state)
+        for key in SWITCH_KEYS:
+            cmd = payload.get(key)
+            if cmd == 1:
+                state[key] = 2 if state[key] == 1 else 1
+            elif cmd == 2:
+                state[key] = 2
+        # 设备联动：开启取暖时吹风必开，吹风关闭时取暖随之关闭
+        if any(state[key] == 1 and before[key] == 2 for key in WARMING_KEYS):
+            state["windSwitch"] = 1
+        elif state["windSwitch"] == 2:
+            for key in WARMING_KEYS:
+                state[key] = 2
+
+    def set_protection(self, black_setting):
+        self.state["blackSetting"] = dict(black_setting)
+
+    def tick(self):
+        """温度随取暖状态缓慢变化"""
+        warming = sum(self.state[key] == 1 for key in WARMING_KEYS)
+        delta = 0.3 * warming if warming else -0.05
+        self.state["temperature"] = round(min(45, max(15, self.state["temperature"] + delta)), 1)
+
+def create_app(heater, latency=0.0):
+    async def delay():
+        if latency:
+            await asyncio.sleep(latency)
+
+    async def status(request):
+        await delay()
+        heater.tick()
+        return web.json_response(heater.state)
+
+    async def control(request):
+        await delay()
+        heater.apply_control(json.loads(await request.text()))
+        return web.json_response({"code": 200, "msg": "ok"})
+
+    async def protection(request):
+        await delay()
+        body = json.loads(await request.text())
+        heater.set_protection(body.get("blackSetting", {}))
+        return web.json_response({"code": 200, "msg": "ok"})
+
+    app = web.Application()
+    app.router.add_get("/api/v1/status", status)
+    app.router.add_put("/api/v1/control", control)
+    app.router.add_post("/api/v1/protection", protection)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="峥果浴霸局域网模拟器")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--mac", default="AABBCCDDEEFF")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的模拟延时（秒）")
+    args = parser.parse_args()
+    web.run_app(create_app(SimulatedHeater(args.mac), args.latency), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()